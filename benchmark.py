@@ -0,0 +1,664 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+from random import Random
+from time import perf_counter, process_time
+from types import SimpleNamespace
+from pandas import DataFrame, concat, isna
+from cache import DAY, CachingFetcher, ResponseCache, get_page_type
+from derive import CHAMBERS, YEARS, derive_full, parse_numbers
+from drivers import create_driver
+from extraction import EXTRACTION_BACKENDS, make_full_soup
+from fetcher import Fetcher
+from parsing import ParsePool
+from records import MoneyRaisedRow, CurrentElectionRow
+from refresh import RefreshState
+from scrapers import (
+    HOMEPAGE, Searcher, CandidateScraper, CandidateCurrentElectionScraper, CurrentElectionCandidateRowScraper,
+    DistrictElectionsScraper, ElectionsScraper, IEScraper, LegislatorScraper, MoneyRaisedCandidateRowScraper,
+    find_current_election_elem, get_text_from_elem, money_to_float, pct_to_float, safe_int,
+)
+from task import CandidateResearcher, MultiCandidateResearcher, fillna_with_didnotrun
+from throttle import AdaptiveThrottle
+
+
+# recorded pages, as fixtures/pages/<page type>/<name>.html (see record_fixtures)
+FIXTURES_DIR = 'fixtures/pages'
+# expected parser outputs, as fixtures/expected/<parser>/<name>.json, and timings to compare runs against
+EXPECTED_DIR = 'fixtures/expected'
+BASELINES_PATH = 'fixtures/baselines.json'
+# slower (or more memory) than the baseline by more than this fraction, and by at least this much, is reported as a
+# regression; pages parse in about a millisecond, where a fraction alone flags noise
+REGRESSION_THRESHOLD = 0.2
+REGRESSION_MIN_CHANGE = {'ms': 0.2, 'peak_kib': 16}
+# parsing speed depends on the process's string hashes (set and dict layouts in the parser), by as much as 2x, so
+# parsers are timed in one process per seed, and compared by their median across them
+HASH_SEEDS = (1, 2, 3, 4, 5)
+# page type: (scraper class, its arguments, function of the scraper returning its output)
+PAGE_SCRAPERS = {
+    'search': (Searcher, ('fixture',), lambda scraper: scraper.result),
+    'candidate': (
+        CandidateScraper, ('https://www.vpap.org/candidates/0/',), lambda scraper: scraper.record.as_dict()
+    ),
+    'elections': (
+        ElectionsScraper, ('https://www.vpap.org/candidates/0/elections/',), lambda scraper: scraper.result
+    ),
+    'legislator': (
+        LegislatorScraper, ('https://www.vpap.org/legislators/0/',), lambda scraper: scraper.bio.as_dict()
+    ),
+    'office': (
+        DistrictElectionsScraper, ('https://www.vpap.org/offices/house-of-delegates-0/elections/',),
+        lambda scraper: {'elections': scraper.result, 'candidates': scraper.candidates},
+    ),
+}
+
+
+def scrape_page(page_type, fetcher, extraction='soup'):
+    scraper_class, args, get_output = PAGE_SCRAPERS[page_type]
+    return get_output(scraper_class(*args, fetcher=fetcher, extraction=extraction))
+
+
+ELECTION_KEYS = ('election_name', 'election_link', 'ie_support', 'ie_oppose')
+PARTY_KEYS = ('name', 'winner', 'party', 'incumbency', 'money_raised_text', 'money_raised')
+DERIVED_KEYS = ('candidate_party', 'is_winner', 'is_incumbent', 'raised')
+
+
+def create_synthetic_candidate(i, rng):
+    # shaped like a CandidateResearcher: basic columns plus a random subset of {year}_{chamber}_* columns
+    result = {
+        'search_string': f'Candidate {i}',
+        'candidate_yoda_name': f'Candidate {i}',
+        'candidate_page_link': f'https://www.vpap.org/candidates/{i}/',
+        'vpap_candidate_num': str(i),
+        'summary': 'x' * 80,
+    }
+    full_record = result.copy()
+    for year in (2019, 2017):
+        for chamber in ('lower', 'upper', 'other'):
+            if rng.random() < 0.4:
+                prefix = f'{year}_{chamber}'
+                full_record.update({f'{prefix}_{key}': rng.random() for key in ELECTION_KEYS})
+                for party in ('D', 'R'):
+                    full_record.update({f'{prefix}_{key}_{party}': rng.random() for key in PARTY_KEYS})
+                full_record[f'{prefix}_name_D'] = result['candidate_yoda_name']
+                full_record.update({f'{prefix}_{key}': rng.random() for key in DERIVED_KEYS})
+    return SimpleNamespace(result=result, full_record=full_record)
+
+
+def accumulate_with_concat_in_loop(candidates):
+    # the previous MultiCandidateResearcher.research accumulation, for comparison
+    basic = DataFrame()
+    full = DataFrame()
+    for cr in candidates:
+        basic = concat((basic, DataFrame([cr.result])), sort=False)
+        full = concat((full, DataFrame([cr.full_record])), sort=False)
+        fillna_with_didnotrun(full)
+    return basic, full
+
+
+def accumulate_with_records(candidates):
+    mcr = MultiCandidateResearcher()
+    for cr in candidates:
+        mcr._add(cr.result['search_string'], cr, None)
+    mcr._create_dataframes()
+    mcr.close()
+    return mcr.basic, mcr.full
+
+
+def benchmark_accumulator(sizes=(1000, 10000), concat_sizes=(250, 500, 1000)):
+    rng = Random(0)
+    candidates = [create_synthetic_candidate(i, rng) for i in range(max(sizes + concat_sizes))]
+
+    for name, accumulate, accumulate_sizes in (
+        ('concat in loop', accumulate_with_concat_in_loop, concat_sizes),
+        ('records', accumulate_with_records, sizes),
+    ):
+        for size in accumulate_sizes:
+            start = perf_counter()
+            basic, full = accumulate(candidates[:size])
+            elapsed = perf_counter() - start
+            print(f'{name:>15}: {size:>6} candidates, {full.shape[1]} columns: {elapsed:8.3f} s '
+                  f'({elapsed / size * 1e6:8.1f} us per candidate)')
+
+
+def create_synthetic_record(i, rng, race_rate=0.4):
+    # a CandidateResearcher's flat record as scraped (numbers still text), with each race at race_rate, running in
+    # some of them as D or R
+    name = f'Candidate, {i}'
+    record = {
+        'search_string': f'Candidate {i}',
+        'candidate_yoda_name': name,
+        'candidate_spent_text': f'${rng.randrange(10 ** 6):,}',
+        'candidate_votes_text': f'{rng.randrange(10 ** 5):,}',
+        'candidate_voteshare_text': f'{rng.random() * 100:.1f}%',
+    }
+    for year in YEARS:
+        for chamber in CHAMBERS:
+            if rng.random() < race_rate:
+                prefix = f'{year}_{chamber}'
+                record.update({f'{prefix}_election_name': f'{year} {chamber}', f'{prefix}_ie_support': None})
+                ran_as = rng.choice(('D', 'R', None))
+                for party in ('D', 'R'):
+                    record.update({
+                        f'{prefix}_name_{party}': name if party == ran_as else f'Opponent, {i}',
+                        f'{prefix}_winner_{party}': rng.random() < 0.5,
+                        f'{prefix}_party_{party}': party,
+                        f'{prefix}_incumbency_{party}': rng.random() < 0.3,
+                        f'{prefix}_money_raised_text_{party}': f'${rng.randrange(10 ** 6):,}',
+                        f'{prefix}_money_raised_{party}': None,
+                    })
+    return record
+
+
+def derive_one_at_a_time(record):
+    # the previous derivation, for comparison: numbers parsed one by one while scraping, then a one-row DataFrame per
+    # candidate (CandidateResearcher._create_dataframes) with .loc lookups and single-element column assignments
+    for key, text in list(record.items()):
+        if text is not None and 'money_raised_text' in key:
+            record[key.replace('money_raised_text', 'money_raised')] = money_to_float(text)
+        elif text and 'spent_text' in key:
+            record[key.replace('spent_text', 'spent')] = money_to_float(text)
+        elif text is not None and 'votes_text' in key:
+            record[key.replace('votes_text', 'votes')] = safe_int(text.replace(',', ''))
+        elif text is not None and 'voteshare_text' in key:
+            record[key.replace('voteshare_text', 'voteshare')] = pct_to_float(text)
+
+    full = DataFrame([record])
+    for year in YEARS:
+        for chamber in CHAMBERS:
+            if not [col for col in full.columns if chamber in col]:
+                continue
+            for key in ('candidate_party', 'is_winner', 'is_incumbent', 'raised'):
+                full[f'{year}_{chamber}_{key}'] = [None]
+            candidate_ran = False
+            for party in ('D', 'R'):
+                if f'{year}_{chamber}_name_{party}' in full.columns:
+                    if full.loc[0, 'candidate_yoda_name'] == full.loc[0, f'{year}_{chamber}_name_{party}']:
+                        full[f'{year}_{chamber}_candidate_party'] = [party]
+                        full[f'{year}_{chamber}_is_winner'] = [full.loc[0, f'{year}_{chamber}_winner_{party}']]
+                        full[f'{year}_{chamber}_is_incumbent'] = [full.loc[0, f'{year}_{chamber}_incumbency_{party}']]
+                        full[f'{year}_{chamber}_raised'] = [full.loc[0, f'{year}_{chamber}_money_raised_{party}']]
+                        candidate_ran = True
+            if not candidate_ran:
+                full = full.drop(columns=[col for col in full.columns if f'{year}_{chamber}' in col])
+    return full.to_dict('records')[0]
+
+
+def get_cell_values(df):
+    # {(search_string, column): value}, with every missing value as None, to compare DataFrames built differently
+    return {
+        (search_string, col): None if isna(value) else value
+        for col in df.columns for search_string, value in zip(df['search_string'], df[col])
+    }
+
+
+def benchmark_derive(sizes=(1000, 10000), one_at_a_time_sizes=(250, 1000)):
+    # derivation of the numeric and full columns: one candidate at a time against one vectorized pass. Returns the
+    # number of batches whose outputs differ
+    rng = Random(0)
+    records = [create_synthetic_record(i, rng) for i in range(max(sizes + one_at_a_time_sizes))]
+
+    outputs = {}
+    for name, derive, derive_sizes in (
+        ('one at a time', derive_each, one_at_a_time_sizes),
+        ('vectorized', derive_vectorized, sizes),
+    ):
+        for size in derive_sizes:
+            start = perf_counter()
+            full = derive(records[:size])
+            elapsed = perf_counter() - start
+            outputs.setdefault(size, []).append(full)
+            print(f'{name:>15}: {size:>6} candidates, {full.shape[1]} columns: {elapsed:8.3f} s '
+                  f'({elapsed / size * 1e6:8.1f} us per candidate)')
+
+    # every race in every record, so that no race column has a missing value (bool columns stay bool)
+    full_races = [create_synthetic_record(i, rng, race_rate=1) for i in range(50)]
+    outputs['every race'] = [derive_each(full_races), derive_vectorized(full_races)]
+
+    failures = 0
+    for size, fulls in outputs.items():
+        if len(fulls) > 1 and len(set(repr(sorted(get_cell_values(full).items())) for full in fulls)) > 1:
+            print(f'{size} candidates: outputs differ')
+            failures += 1
+    return failures
+
+
+def derive_each(records):
+    full = DataFrame([derive_one_at_a_time(dict(record)) for record in records])
+    fillna_with_didnotrun(full)
+    return full
+
+
+def derive_vectorized(records):
+    full = derive_full(parse_numbers(DataFrame(records)))
+    fillna_with_didnotrun(full)
+    return full
+
+
+def create_fixture_fetcher(path):
+    # serves the recorded page for any URL
+    response = SimpleNamespace(text=open(path, encoding='utf-8').read(), ok=True, status_code=200)
+    return SimpleNamespace(get=lambda url, params=None: response)
+
+
+def get_fixture_paths(page_type):
+    return sorted(glob(f'{FIXTURES_DIR}/{page_type}/*.html'))
+
+
+def has_fixtures():
+    # a check on no fixtures at all would pass without checking anything, so it fails instead
+    if not any(get_fixture_paths(page_type) for page_type in PAGE_SCRAPERS):
+        print(f'no fixtures under {FIXTURES_DIR}')
+        return False
+    return True
+
+
+def benchmark_extraction(repeat=20):
+    # CPU time and peak allocation of each extraction backend on every fixture; returns the number of fixtures on
+    # which their outputs differ
+    if not has_fixtures():
+        return 1
+    failures = 0
+    for page_type in PAGE_SCRAPERS:
+        for path in get_fixture_paths(page_type):
+            fetcher = create_fixture_fetcher(path)
+            outputs = {}
+            for extraction in EXTRACTION_BACKENDS:
+                tracemalloc.start()
+                outputs[extraction] = scrape_page(page_type, fetcher, extraction)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+                start = process_time()
+                for _ in range(repeat):
+                    scrape_page(page_type, fetcher, extraction)
+                elapsed = (process_time() - start) / repeat
+                print(f'{path}: {extraction:>6}: {elapsed * 1e3:8.2f} ms CPU, {peak / 1024:8.0f} KiB peak')
+
+            if len(set(repr(output) for output in outputs.values())) > 1:
+                print(f'{path}: outputs differ between extraction backends')
+                failures += 1
+    return failures
+
+
+def create_row_values(row_class, i):
+    return {field: f'{field} {i}' for field in row_class.fields}
+
+
+def benchmark_records(size=100000):
+    # memory held by a batch of scraped rows: plain objects carrying a __dict__ (as the row scrapers used to be)
+    # against the slotted record types
+    for row_class in (MoneyRaisedRow, CurrentElectionRow):
+        values = [create_row_values(row_class, i) for i in range(size)]
+        for name, create_row in (
+            ('__dict__', lambda row_values: SimpleNamespace(**row_values)),
+            ('slots', lambda row_values: row_class(**row_values)),
+        ):
+            tracemalloc.start()
+            start = perf_counter()
+            rows = [create_row(row_values) for row_values in values]
+            elapsed = perf_counter() - start
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del rows
+            print(f'{row_class.__name__:>18}: {name:>8}: {size} rows, {current / size:6.0f} bytes per row, '
+                  f'{elapsed:6.3f} s')
+
+
+def get_candidate_name(soup):
+    return get_text_from_elem(soup.find('h3', {'style': 'margin-top:0;'}), '')
+
+
+def get_table_rows(elem):
+    return [row for table in elem.find_all('table', class_='table') for row in table.find('tbody').find_all('tr')]
+
+
+# parsers of parts of a page, benchmarked on a soup of the page: parser: (page type, function of soup returning output)
+ELEMENT_SCRAPERS = {
+    'current_election': ('candidate', lambda soup: CandidateCurrentElectionScraper(
+        find_current_election_elem(soup), get_candidate_name(soup)
+    ).record.as_dict()),
+    'current_election_rows': ('candidate', lambda soup: [
+        CurrentElectionCandidateRowScraper(row).record.as_dict()
+        for row in get_table_rows(find_current_election_elem(soup))
+    ]),
+    'money_raised_rows': ('elections', lambda soup: [
+        MoneyRaisedCandidateRowScraper(row).record.as_dict() for row in get_table_rows(soup)[:12]
+    ]),
+}
+
+
+def get_fixture_parsers():
+    # (parser, fixture path, function returning the parser's output for the fixture)
+    for page_type in PAGE_SCRAPERS:
+        for path in get_fixture_paths(page_type):
+            fetcher = create_fixture_fetcher(path)
+            yield page_type, path, lambda page_type=page_type, fetcher=fetcher: scrape_page(page_type, fetcher)
+
+    for parser, (page_type, scrape) in ELEMENT_SCRAPERS.items():
+        for path in get_fixture_paths(page_type):
+            soup = make_full_soup(open(path, encoding='utf-8').read())
+            yield parser, path, lambda soup=soup, scrape=scrape: scrape(soup)
+
+
+def get_ie_parsers():
+    # rendered IE chart pages need a browser (loaded from file, so still offline); skipped if none can be started
+    paths = get_fixture_paths('ie')
+    if not paths:
+        return None, []
+    try:
+        driver = create_driver()
+    except Exception as exc:
+        print(f'ie: skipped, no browser ({exc})')
+        return None, []
+    return driver, [
+        ('ie', path, lambda path=path: {
+            vpap_candidate_num: amounts.as_dict()
+            for vpap_candidate_num, amounts in IEScraper(driver, f'file://{os.path.abspath(path)}').amounts.items()
+        })
+        for path in paths
+    ]
+
+
+def get_fixture_key(parser, path):
+    return f'{parser}/{os.path.splitext(os.path.basename(path))[0]}'
+
+
+def measure(scrapes, repeat, rounds=5):
+    # timing of each scrape: the median of `rounds` rounds of `repeat` runs, the rounds of all scrapes taken in turn,
+    # so that a burst of load on the machine slows one round of a few pages rather than every round of one
+    peaks = []
+    for scrape in scrapes:
+        tracemalloc.start()
+        scrape()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    round_times = [[] for _ in scrapes]
+    for _ in range(rounds):
+        for scrape, times in zip(scrapes, round_times):
+            start = process_time()
+            for _ in range(repeat):
+                scrape()
+            times.append((process_time() - start) / repeat)
+    return [
+        {'ms': sorted(times)[rounds // 2] * 1e3, 'peak_kib': peak / 1024} for peak, times in zip(peaks, round_times)
+    ]
+
+
+def get_parsers():
+    # (browser driver or None, [(parser, fixture path, scrape)])
+    driver, ie_parsers = get_ie_parsers()
+    return driver, list(get_fixture_parsers()) + ie_parsers
+
+
+def get_parser_timings(repeat=20):
+    # {fixture key: timing} of every parser in this process (see measure_parsers)
+    driver, parsers = get_parsers()
+    try:
+        timings = measure([scrape for _, _, scrape in parsers], repeat)
+    finally:
+        if driver:
+            driver.quit()
+    return {get_fixture_key(parser, path): timing for (parser, path, _), timing in zip(parsers, timings)}
+
+
+def measure_parsers():
+    # {fixture key: timing} with the median of each metric across processes with the HASH_SEEDS
+    runs = []
+    for seed in HASH_SEEDS:
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), 'parser-timings'], stdout=subprocess.PIPE, check=True,
+            env=dict(os.environ, PYTHONHASHSEED=str(seed)), universal_newlines=True,
+        )
+        # the timings are the last line, after anything the parsers printed
+        runs.append(json.loads(process.stdout.strip().split('\n')[-1]))
+    timings = {}
+    for key in runs[0]:
+        timing = {metric: sorted(run[key][metric] for run in runs)[len(runs) // 2] for metric in ('ms', 'peak_kib')}
+        timing['per_second'] = 1e3 / timing['ms'] if timing['ms'] else 0
+        timings[key] = timing
+    return timings
+
+
+def benchmark_parsers(update=False):
+    # every parser on every recorded page it applies to: throughput and peak allocation, compared with the saved
+    # baseline, and output compared with the saved expected output. update=True saves both from this run instead.
+    # Returns the number of regressions and output differences
+    if not has_fixtures():
+        return 1
+    baselines = json.load(open(BASELINES_PATH)) if os.path.exists(BASELINES_PATH) else {}
+    timings = measure_parsers()
+    driver, parsers = get_parsers()
+    failures = 0
+    try:
+        for parser, path, scrape in parsers:
+            key = get_fixture_key(parser, path)
+            output = json.loads(json.dumps(scrape(), default=str))
+            timing = timings[key]
+            expected_path = f'{EXPECTED_DIR}/{key}.json'
+
+            line = f'{key:>45}: {timing["ms"]:8.2f} ms, {timing["per_second"]:8.1f}/s, {timing["peak_kib"]:8.0f} KiB'
+            baseline = baselines.get(key)
+            if baseline and not update:
+                for metric in ('ms', 'peak_kib'):
+                    change = timing[metric] / baseline[metric] - 1 if baseline[metric] else 0
+                    line += f', {metric} {change:+7.1%}'
+                    if (change > REGRESSION_THRESHOLD
+                            and timing[metric] - baseline[metric] >= REGRESSION_MIN_CHANGE[metric]):
+                        line += ' REGRESSION'
+                        failures += 1
+
+            if update:
+                os.makedirs(os.path.dirname(expected_path), exist_ok=True)
+                with open(expected_path, 'w', encoding='utf-8') as f:
+                    json.dump(output, f, indent=2, sort_keys=True)
+                baselines[key] = timing
+            elif not os.path.exists(expected_path):
+                line += ', no expected output'
+            elif json.load(open(expected_path, encoding='utf-8')) != output:
+                line += ', OUTPUT DIFFERS'
+                failures += 1
+            print(line)
+    finally:
+        if driver:
+            driver.quit()
+
+    if update:
+        with open(BASELINES_PATH, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+    print(f'{failures} regressions or output differences')
+    return failures
+
+
+def update_parser_baselines():
+    return benchmark_parsers(update=True)
+
+
+def benchmark_parse_pool(repeat=50, threads=16):
+    # pages per second parsed by `threads` fetching threads, in those threads (GIL-bound) and in ParsePools of
+    # increasing size. Run on a multi-core machine for the scaling to show
+    if not has_fixtures():
+        return 1
+    pages = [
+        (page_type, create_fixture_fetcher(path))
+        for page_type in PAGE_SCRAPERS for path in get_fixture_paths(page_type)
+    ] * repeat
+
+    def run(scrape):
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda page: scrape(*page), pages))
+        return len(pages) / (perf_counter() - start)
+
+    in_threads = run(scrape_page)
+    print(f'{"in threads":>13}: {in_threads:8.1f} pages/s ({os.cpu_count()} cores)')
+    for workers in sorted({1, 2, 4, os.cpu_count()}):
+        pool = ParsePool(workers)
+
+        def scrape_in_pool(page_type, fetcher):
+            scraper_class, args, get_output = PAGE_SCRAPERS[page_type]
+            return get_output(pool.scrape(scraper_class, *args, fetcher=fetcher))
+
+        for page in pages[:workers * 2]:
+            scrape_in_pool(*page)  # start the worker processes
+        pages_per_second = run(scrape_in_pool)
+        pool.close()
+        print(f'{workers:>3} processes: {pages_per_second:8.1f} pages/s ({pages_per_second / in_threads:.2f}x)')
+
+
+# name: (5xx rate, 429 rate, whether the interval must stay within its initial value)
+THROTTLE_SCENARIOS = {
+    'healthy': (0, 0, True),
+    'random 5xx': (0.2, 0, True),
+    'random 5xx and 429': (0.2, 0.05, True),
+    'outage': (1, 0, False),
+}
+
+
+def benchmark_throttle(requests=2000):
+    # the AdaptiveThrottle's interval under random failures (simulated, without waiting): under a low random error
+    # rate it must settle within its initial value, and under an outage it must not. Returns the number of failing
+    # scenarios
+    failures = 0
+    for name, (error_rate, throttle_rate, bounded) in THROTTLE_SCENARIOS.items():
+        rng = Random(0)
+        throttle = AdaptiveThrottle()
+        intervals = []
+        for _ in range(requests):
+            roll = rng.random()
+            status_code = 500 if roll < error_rate else 429 if roll < error_rate + throttle_rate else 200
+            throttle.record(status_code, 0.1)
+            intervals.append(throttle.interval)
+        # the second half, once the interval has settled; a burst of 429s still doubles it a few times in a row
+        settled = intervals[requests // 2:]
+        mean = sum(settled) / len(settled)
+        line = f'{name:>20}: interval {min(settled):6.2f} to {max(settled):6.2f} s, mean {mean:6.2f} s'
+        if bounded != (mean <= AdaptiveThrottle().interval):
+            line += ' UNBOUNDED' if bounded else ' NO BACKOFF'
+            failures += 1
+        print(line)
+    return failures
+
+
+def benchmark_refresh(days=7):
+    # a weekly incremental refresh (with the default RefreshState max_age): a candidate scraped `days` ago, none of
+    # whose pages changed, must be reused after conditional requests only. Returns 1 if it is re-scraped or any of
+    # its pages is requested unconditionally
+    requests = []
+
+    def get(url, params=None, headers=None):
+        requests.append(headers)
+        if headers:
+            return SimpleNamespace(status_code=304, text='', ok=False, headers={'ETag': '"1"'})
+        return SimpleNamespace(status_code=200, text=url, ok=True, headers={'ETag': '"1"'})
+
+    pages = [
+        (HOMEPAGE + '/search/', {'q': 'candidate'}), (HOMEPAGE + '/candidates/1/', None),
+        (HOMEPAGE + '/candidates/1/elections/', None), (HOMEPAGE + '/legislators/1/', None),
+    ]
+    with tempfile.TemporaryDirectory() as path:
+        cache = ResponseCache(f'{path}/responses.sqlite')
+        fetcher = CachingFetcher(SimpleNamespace(get=get), cache, conditional=True)
+        refresh_state = RefreshState(f'{path}/refresh.sqlite')
+        for url, params in pages:
+            fetcher.get(url, params)
+        refresh_state.put('Candidate', pages, {'search_string': 'Candidate'}, {'search_string': 'Candidate'})
+
+        # as if scraped `days` ago
+        cache.conn.execute('UPDATE responses SET stored_at = stored_at - ?', (days * DAY,))
+        cache.conn.commit()
+        refresh_state.conn.execute('UPDATE candidates SET scraped_at = scraped_at - ?', (days * DAY,))
+        refresh_state.conn.commit()
+        del requests[:]
+        reused = refresh_state.get_unchanged('Candidate', fetcher)
+        cache.close()
+        refresh_state.close()
+
+    conditional = sum(1 for headers in requests if headers)
+    print(f'{days} days later: {"reused" if reused else "re-scraped"} after {len(requests)} requests, '
+          f'{conditional} of them conditional')
+    # pages still fresh in the cache (e.g. the search page, cached for 30 days) aren't requested at all
+    return 0 if reused and requests and conditional == len(requests) else 1
+
+
+class FixtureRecorder:
+    # wraps a fetcher to save every page it fetches as a fixture, under the page's type
+    def __init__(self, fetcher, name):
+        self.fetcher = fetcher
+        self.name = name
+        self.paths = []
+
+    def get(self, url, params=None, headers=None):
+        r = self.fetcher.get(url, params=params, headers=headers)
+        if r.ok:
+            self.save(get_page_type(url), r.text)
+        return r
+
+    def save(self, page_type, text):
+        os.makedirs(f'{FIXTURES_DIR}/{page_type}', exist_ok=True)
+        path = f'{FIXTURES_DIR}/{page_type}/{self.name}.html'
+        i = 1
+        while path in self.paths or os.path.exists(path):
+            i += 1
+            path = f'{FIXTURES_DIR}/{page_type}/{self.name}_{i}.html'
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        self.paths.append(path)
+        print('recorded', path)
+
+
+def record_fixtures(*candidate_names):
+    # saves a candidate's search, candidate, elections and legislator pages, and its rendered IE charts, from VPAP
+    driver = None
+    for candidate_name in candidate_names:
+        recorder = FixtureRecorder(Fetcher(), re.sub(r'[^a-z0-9]+', '_', candidate_name.lower()).strip('_'))
+        cr = CandidateResearcher(candidate_name, fetcher=recorder)
+        if cr.cand.record.has_ie:
+            driver = driver or create_driver()
+            for election in cr.elec.elections:
+                driver.get(election.election_link)
+                recorder.save('ie', driver.page_source)
+    if driver:
+        driver.quit()
+
+
+BENCHMARKS = {
+    'accumulator': benchmark_accumulator,
+    'extraction': benchmark_extraction,
+    'records': benchmark_records,
+    'derive': benchmark_derive,
+    'parsers': benchmark_parsers,
+    'parsers-update': update_parser_baselines,
+    'parse-pool': benchmark_parse_pool,
+    'throttle': benchmark_throttle,
+    'refresh': benchmark_refresh,
+}
+
+
+def main():
+    # python benchmark.py [benchmark ...], or python benchmark.py record "Candidate Name" [...]
+    if sys.argv[1:2] == ['record']:
+        record_fixtures(*sys.argv[2:])
+        return
+    if sys.argv[1:2] == ['parser-timings']:
+        print(json.dumps(get_parser_timings()))
+        return
+    # exits with 1 if any benchmark reports failures (regressions or differing outputs)
+    failures = 0
+    for name in sys.argv[1:] or BENCHMARKS:
+        if name == 'parsers-update' and not sys.argv[1:]:
+            continue
+        print(f'== {name}')
+        failures += BENCHMARKS[name]() or 0
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+import os
+import sqlite3
+import zlib
+from threading import Lock
+from time import time
+from urllib.parse import urlencode, urlsplit
+
+
+DAY = 24 * 60 * 60
+
+# seconds a cached page stays fresh, by page type
+DEFAULT_TTLS = {
+    'search': 30 * DAY,
+    'candidate': DAY,
+    'elections': DAY,
+    'legislator': 7 * DAY,
+    'office': DAY,
+    'other': DAY,
+}
+# seconds a failed lookup (e.g. the legislator page of a candidate who was never a legislator) stays cached
+DEFAULT_NEGATIVE_TTL = 7 * DAY
+
+
+def get_page_type(url):
+    path = urlsplit(url).path
+    if path.startswith('/search/'):
+        return 'search'
+    elif path.startswith('/candidates/') and '/elections/' in path:
+        return 'elections'
+    elif path.startswith('/candidates/'):
+        return 'candidate'
+    elif path.startswith('/legislators/'):
+        return 'legislator'
+    elif path.startswith('/offices/'):
+        return 'office'
+    return 'other'
+
+
+def get_cache_key(url, params=None):
+    if params:
+        return url + '?' + urlencode(sorted(params.items()))
+    return url
+
+
+class CachedResponse:
+    def __init__(self, url, status_code, text, etag=None, last_modified=None):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.from_cache = True
+        self.not_modified = False
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def get_conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    # on-disk (SQLite) cache of page responses, with per-page-type TTLs, negative caching of failed lookups and
+    # least-recently-used eviction once the stored (compressed) bodies exceed max_bytes
+    def __init__(self, path='cache/responses.sqlite', max_bytes=500 * 1024 * 1024, ttls=None,
+                 negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._connect()
+
+    def _connect(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, url TEXT, page_type TEXT, status_code INTEGER, body BLOB, size INTEGER, '
+            'stored_at REAL, last_accessed REAL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS responses_last_accessed ON responses (last_accessed)')
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(responses)')]
+        for column in ('etag', 'last_modified'):
+            if column not in columns:
+                self.conn.execute(f'ALTER TABLE responses ADD COLUMN {column} TEXT')
+        self.conn.commit()
+
+    def _get_ttl(self, url, status_code):
+        if status_code >= 400:
+            return self.negative_ttl
+        return self.ttls[get_page_type(url)]
+
+    def get(self, url, params=None, stale=False):
+        # stale=True also returns an expired response (e.g. to revalidate it with a conditional request)
+        key = get_cache_key(url, params)
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT status_code, body, stored_at, etag, last_modified FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row:
+                status_code, body, stored_at, etag, last_modified = row
+                if stale or time() - stored_at < self._get_ttl(url, status_code):
+                    self.conn.execute('UPDATE responses SET last_accessed = ? WHERE key = ?', (time(), key))
+                    self.conn.commit()
+                    if not stale:
+                        self.hits += 1
+                    return CachedResponse(
+                        key, status_code, zlib.decompress(body).decode('utf-8'), etag, last_modified
+                    )
+            if not stale:
+                self.misses += 1
+            return None
+
+    def touch(self, url, params=None):
+        # the stored response was revalidated, so it is fresh again
+        with self._lock:
+            self.conn.execute('UPDATE responses SET stored_at = ? WHERE key = ?', (time(), get_cache_key(url, params)))
+            self.conn.commit()
+
+    def put(self, url, params, response):
+        if response.status_code >= 500 or response.status_code == 429:
+            return  # transient failures are not cached
+        key = get_cache_key(url, params)
+        body = zlib.compress(response.text.encode('utf-8'))
+        now = time()
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(key, url, page_type, status_code, body, size, stored_at, last_accessed, etag, last_modified) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    key, url, get_page_type(url), response.status_code, body, len(body), now, now,
+                    response.headers.get('ETag', None), response.headers.get('Last-Modified', None),
+                )
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        total_size = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+        for key, size in self.conn.execute('SELECT key, size FROM responses ORDER BY last_accessed').fetchall():
+            self.conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total_size -= size
+            if total_size <= self.max_bytes:
+                break
+
+    def close(self):
+        self.conn.close()
+
+
+class CachingFetcher:
+    # wraps any fetcher (Fetcher, AsyncFetcher) so that fresh cached responses are served without a request. With
+    # conditional=True, expired responses are revalidated with If-None-Match / If-Modified-Since; a 304 (or an
+    # identical body) returns the cached response with not_modified=True
+    def __init__(self, fetcher, cache, conditional=False):
+        self.fetcher = fetcher
+        self.cache = cache
+        self.conditional = conditional
+
+    def get(self, url, params=None):
+        r = self.cache.get(url, params)
+        if r is None:
+            r = self._fetch(url, params)
+        return r
+
+    def _fetch(self, url, params):
+        cached = self.cache.get(url, params, stale=True) if self.conditional else None
+        headers = cached.get_conditional_headers() if cached else None
+
+        r = self.fetcher.get(url, params=params, headers=headers)
+        if cached and (r.status_code == 304 or (r.status_code == cached.status_code and r.text == cached.text)):
+            self.cache.touch(url, params)
+            cached.not_modified = True
+            return cached
+
+        self.cache.put(url, params, r)
+        return r
+
+    def is_unchanged(self, url, params=None):
+        # True if the page is still fresh in the cache, or was revalidated as not modified
+        return isinstance(self.get(url, params), CachedResponse)
+
+    @property
+    def session(self):
+        return self.fetcher.session
+
+    def close(self):
+        self.fetcher.close()
+        self.cache.close()
@@ -0,0 +1,100 @@
+import os
+import sys
+from glob import glob
+from numpy import integer
+from pandas import ArrowDtype, DataFrame, read_csv, read_parquet, to_numeric
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None  # pandas raises a helpful ImportError when writing without pyarrow
+
+
+DIDNOTRUN = 'N/A'  # see task.fillna_with_didnotrun
+KEY_COLUMN = 'search_string'
+FORMATS = {
+    # format: file extension
+    'parquet': 'parquet',
+    'feather': 'feather',
+}
+BOOLEANS = {True: True, False: False, 'True': True, 'False': False}
+
+
+def get_didnotrun_mask(df):
+    # True where a candidate did not run in a year and chamber; one column per column that has any 'N/A'
+    cols = [col for col in df.columns if (df[col] == DIDNOTRUN).any()]
+    mask = DataFrame({col: (df[col] == DIDNOTRUN).to_numpy() for col in cols})
+    if KEY_COLUMN in df.columns:
+        mask.insert(0, KEY_COLUMN, df[KEY_COLUMN].astype('string').to_numpy())
+    return mask
+
+
+def is_integral(value):
+    # 292526 and '292526' are integers; 292526.0 and '292526.0' (a float column written to CSV) are not
+    if isinstance(value, str):
+        return value.lstrip('-').isdigit()
+    return isinstance(value, (int, integer)) and not isinstance(value, bool)
+
+
+def to_typed_column(column):
+    column = column.where(column != DIDNOTRUN)
+    values = column.dropna()
+    if values.map(lambda value: isinstance(value, (bool, str)) and value in BOOLEANS).all() and len(values):
+        return column.map(BOOLEANS, na_action='ignore').astype('boolean')
+
+    numbers = to_numeric(column, errors='coerce')
+    if numbers.notna().sum() == len(values) and len(values):
+        return numbers.astype('Int64' if values.map(is_integral).all() else 'Float64')
+    return column.astype('string')
+
+
+def to_typed(df):
+    # (typed frame, did-not-run mask): 'N/A' becomes null, and every column gets one nullable dtype (boolean,
+    # Int64, Float64 or string) instead of object
+    typed = DataFrame({col: to_typed_column(df[col]) for col in df.columns})
+    typed.index = range(len(typed))
+    return typed, get_didnotrun_mask(df)
+
+
+def get_paths(path_prefix, fmt):
+    extension = FORMATS[fmt]
+    return f'{path_prefix}.{extension}', f'{path_prefix}_didnotrun.{extension}'
+
+
+def write_typed(df, path_prefix, fmt='parquet'):
+    typed, mask = to_typed(df)
+    path, mask_path = get_paths(path_prefix, fmt)
+    if fmt == 'feather':
+        # uncompressed, so that read_typed can memory-map the columns instead of decompressing them
+        typed.to_feather(path, compression='uncompressed')
+        mask.to_feather(mask_path, compression='uncompressed')
+    else:
+        typed.to_parquet(path, index=False)
+        mask.to_parquet(mask_path, index=False)
+    return path, mask_path
+
+
+def read_typed(path_prefix, fmt='parquet'):
+    # Arrow-backed frames: Feather files are memory-mapped and read without copying; Parquet is decoded once
+    path, mask_path = get_paths(path_prefix, fmt)
+    if fmt == 'feather':
+        return tuple(
+            feather.read_table(p, memory_map=True).to_pandas(types_mapper=ArrowDtype) for p in (path, mask_path)
+        )
+    return tuple(read_parquet(p, dtype_backend='pyarrow') for p in (path, mask_path))
+
+
+def read_csv_with_didnotrun(path):
+    # 'N/A' is read as the string, not as NaN, so that did-not-run stays distinct from missing
+    return read_csv(path, keep_default_na=False, na_values=[''])
+
+
+def convert_csvs(data_dir='data', fmt='parquet'):
+    # writes a typed file and a did-not-run mask next to each CSV in data_dir
+    for csv_path in sorted(glob(os.path.join(data_dir, '*.csv'))):
+        path, _ = write_typed(read_csv_with_didnotrun(csv_path), csv_path[:-len('.csv')], fmt)
+        print(csv_path, '->', path)
+
+
+if __name__ == '__main__':
+    convert_csvs(*sys.argv[1:])
@@ -0,0 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor
+from names import get_name_key
+from scrapers import HOMEPAGE, CandidateElections, DistrictElectionsScraper, create_search_result
+
+
+# chamber: (office slug, number of districts)
+OFFICES = {
+    'lower': ('house-of-delegates', 100),
+    'upper': ('state-senate', 40),
+}
+
+
+class DistrictCrawler:
+    # crawls every district's elections page for a year and chamber once (one request per district), and maps
+    # candidate names to their candidate pages and races, so that no per-candidate search or elections page is needed
+    def __init__(self, year, chamber, fetcher=None, extraction='soup', concurrency=1):
+        self.year = year
+        self.chamber = chamber
+        self.fetcher = fetcher
+        self.extraction = extraction
+        self.concurrency = concurrency
+        self.races = {}
+        self.candidates = []
+        self.errors = []
+        self._crawl()
+
+    def _get_district_page_links(self):
+        office, districts = OFFICES[self.chamber]
+        for district in range(1, districts + 1):
+            yield f'{HOMEPAGE}/offices/{office}-{district}/elections/?year_and_type={self.year}regular'
+
+    def _crawl(self):
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for district_page_link, race, exc in executor.map(self._scrape_district, self._get_district_page_links()):
+                if exc is None:
+                    self._add_race(district_page_link, race)
+                else:
+                    self.errors.append({'district_page_link': district_page_link, 'error_message': str(exc)})
+
+    def _scrape_district(self, district_page_link):
+        try:
+            race = DistrictElectionsScraper(district_page_link, self.fetcher, self.extraction)
+            return district_page_link, race, None
+        except Exception as exc:
+            return district_page_link, None, exc
+
+    def _add_race(self, district_page_link, race):
+        self.races[district_page_link] = race.elections
+        for candidate in race.candidates:
+            if candidate['year'] == str(self.year):
+                candidate.update({
+                    'district_page_link': district_page_link,
+                    'name_key': get_name_key(candidate['name']),
+                })
+                self.candidates.append(candidate)
+
+    def search(self, candidate_name):
+        name_key = get_name_key(candidate_name)
+        matches = [
+            candidate for candidate in self.candidates
+            if name_key and candidate['name_key']
+            and (name_key <= candidate['name_key'] or candidate['name_key'] <= name_key)
+        ]
+        if not matches:
+            raise AssertionError(
+                f'No candidates found in {self.year} {self.chamber} races for search string "{candidate_name}".'
+            )
+        elif len(matches) > 1:
+            raise AssertionError(
+                f'{len(matches)} candidates found in {self.year} {self.chamber} races for search string '
+                f'"{candidate_name}". Please disambiguate.'
+            )
+        return create_search_result(
+            candidate_name, matches[0]['name'], matches[0]['candidate_page_link'],
+            district_page_link=matches[0]['district_page_link'],
+        )
+
+    def get_race(self, search_result):
+        # the candidate's race, as if from its elections page: only the crawled year and chamber's general election,
+        # copied so that each candidate gets its own IE amounts (see CandidateElections.submit_ie)
+        return CandidateElections(election.copy() for election in self.races[search_result.district_page_link])
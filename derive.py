@@ -0,0 +1,97 @@
+from pandas import DataFrame, Series, concat, to_numeric
+
+
+YEARS = (2019, 2017)
+CHAMBERS = ('lower', 'upper', 'other')
+PARTIES = ('D', 'R')
+# derived column: the column of the candidate's party it is taken from ({year}_{chamber}_{column}_{party})
+DERIVED_FROM = {
+    'is_winner': 'winner',
+    'is_incumbent': 'incumbency',
+    'raised': 'money_raised',
+}
+
+
+def parse_money(texts):
+    # scrapers.money_to_float for a whole column: '$1,234' -> 1234.0, unparsable or empty -> 0, missing stays missing
+    numbers = to_numeric(texts.str.replace(r'[$,]', '', regex=True).str.strip(), errors='coerce')
+    numbers = numbers.astype('float64').fillna(0)
+    return numbers.where(texts.notna())
+
+
+def parse_count(texts):
+    # scrapers.safe_int (after removing thousands separators) for a whole column: text that isn't an integer is kept
+    stripped = texts.str.replace(',', '', regex=False).str.strip()
+    integral = stripped.str.fullmatch(r'[+-]?\d+').fillna(False).astype(bool)
+    counts = stripped.astype(object)
+    counts[integral] = stripped[integral].astype('int64').to_numpy(dtype=object)
+    counts[stripped.isin(('', '-', 'None'))] = 0
+    return counts.where(texts.notna())
+
+
+def parse_percent(texts):
+    # scrapers.pct_to_float for a whole column: '52.3%' -> 52.3, unparsable or empty -> 0
+    numbers = to_numeric(texts.str.replace(r'[%,-]', '', regex=True).str.strip(), errors='coerce')
+    numbers = numbers.astype('float64').fillna(0)
+    return numbers.where(texts.notna())
+
+
+# field parsed from the text scraped as {field}_text (in columns {...}_{field}_text[_{party}]): parser
+NUMERIC_FIELDS = {
+    'money_raised': parse_money,
+    'spent': lambda texts: parse_money(texts.mask(texts == '')),  # empty spent text is left missing
+    'votes': parse_count,
+    'voteshare': parse_percent,
+}
+
+
+def parse_numbers(df):
+    # fills in the numeric columns (money raised, spent, votes, vote share) from the text scraped for them, for all
+    # candidates at once; scrapers only keep the text
+    df = df.copy()
+    for col in df.columns:
+        for field, parse in NUMERIC_FIELDS.items():
+            if f'{field}_text' in col:
+                texts = df[col].astype('string').astype(object)
+                df[col.replace(f'{field}_text', field)] = parse(texts) if texts.notna().any() else None
+    return df
+
+
+def derive_full(df):
+    # the `full` columns of every candidate's races: for each {year}_{chamber} race a candidate ran in (as its D or R
+    # candidate), candidate_party, is_winner, is_incumbent and raised, taken from their party's columns. The race's
+    # columns are blanked for candidates who didn't run in it, and left out if no candidate did
+    full = df.copy()
+    derived = {}
+    for year in YEARS:
+        for chamber in CHAMBERS:
+            prefix = f'{year}_{chamber}'
+            race_columns = [col for col in full.columns if prefix in col]
+            if not race_columns:
+                continue
+
+            party = Series(None, index=full.index, dtype=object)
+            for party_letter in PARTIES:
+                name_col = f'{prefix}_name_{party_letter}'
+                if name_col in full.columns and 'candidate_yoda_name' in full.columns:
+                    party = party.mask(full['candidate_yoda_name'] == full[name_col], party_letter)
+            ran = party.notna()
+            if not ran.any():
+                full = full.drop(columns=race_columns)
+                continue
+
+            # as objects, since a race's column may be all bool (or int), which can't hold None
+            full[race_columns] = full[race_columns].astype(object).where(ran, None, axis=0)
+            derived[f'{prefix}_candidate_party'] = party
+            for key, source in DERIVED_FROM.items():
+                values = Series(None, index=full.index, dtype=object)
+                for party_letter in PARTIES:
+                    source_col = f'{prefix}_{source}_{party_letter}'
+                    if source_col in full.columns:
+                        values = values.mask(party == party_letter, full[source_col])
+                derived[f'{prefix}_{key}'] = values
+    if derived:
+        # replacing those of records derived before (e.g. journaled by an earlier version)
+        full = full.drop(columns=[col for col in derived if col in full.columns])
+        full = concat((full, DataFrame(derived, index=full.index)), axis=1)
+    return full
@@ -0,0 +1,120 @@
+import os
+from contextlib import contextmanager
+from queue import Queue, Empty
+from threading import Lock
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.firefox.options import Options
+from selenium.webdriver.firefox.service import Service
+
+
+GECKODRIVER_PATH = os.environ.get('GECKODRIVER_PATH', 'G:/GitHub/geckodriver.exe')
+
+
+# fast mode: skip images, stylesheets, web fonts and trackers (analytics); IE charts are drawn by the page's own script
+FAST_MODE_PREFERENCES = {
+    'permissions.default.image': 2,
+    'permissions.default.stylesheet': 2,
+    'gfx.downloadable_fonts.enabled': False,
+    'browser.display.use_document_fonts': 0,
+    'privacy.trackingprotection.enabled': True,
+}
+
+
+def create_driver(executable_path=GECKODRIVER_PATH, fast=False):
+    options = Options()
+    options.add_argument('-headless')
+    if fast:
+        # return from driver.get() once the DOM is ready, instead of waiting for every resource to load
+        options.set_capability('pageLoadStrategy', 'eager')
+        for name, value in FAST_MODE_PREFERENCES.items():
+            options.set_preference(name, value)
+    return webdriver.Firefox(options=options, service=Service(executable_path=executable_path))
+
+
+class DriverWorker:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+    def is_healthy(self):
+        try:
+            self.driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except WebDriverException:
+            pass  # already crashed
+
+
+class DriverPool:
+    # bounded pool of headless browsers, created on first use. A worker is health-checked before each use (and
+    # replaced if its browser crashed), and is replaced after max_pages pages
+    def __init__(self, size=2, executable_path=GECKODRIVER_PATH, max_pages=50, fast=False):
+        self.size = size
+        self.executable_path = executable_path
+        self.max_pages = max_pages
+        self.fast = fast
+        self.created = 0
+        self.recycled = 0
+        self._idle = Queue()
+        self._lock = Lock()
+
+    @contextmanager
+    def driver(self):
+        worker = self._acquire()
+        try:
+            yield worker.driver
+        finally:
+            worker.pages += 1
+            self._release(worker)
+
+    def _acquire(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except Empty:
+                worker = self._create()
+                if worker is None:
+                    try:
+                        worker = self._idle.get(timeout=1)  # retry, in case a worker was discarded meanwhile
+                    except Empty:
+                        continue
+
+            if worker.is_healthy():
+                return worker
+            self._discard(worker)
+
+    def _create(self):
+        with self._lock:
+            if self.created - self.recycled >= self.size:
+                return None
+            self.created += 1
+        try:
+            return DriverWorker(create_driver(self.executable_path, fast=self.fast))
+        except Exception:
+            with self._lock:
+                self.created -= 1
+            raise
+
+    def _release(self, worker):
+        if worker.pages >= self.max_pages:
+            self._discard(worker)
+        else:
+            self._idle.put(worker)
+
+    def _discard(self, worker):
+        worker.quit()
+        with self._lock:
+            self.recycled += 1
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().quit()
+            except Empty:
+                break
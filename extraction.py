@@ -0,0 +1,48 @@
+from bs4 import BeautifulSoup
+from lxml import etree, html
+
+
+def _has_class(class_name):
+    return f'contains(concat(" ", normalize-space(@class), " "), " {class_name} ")'
+
+
+# the subtrees of each page type that the scrapers read from; anything outside them is never turned into Soup
+PAGE_XPATHS = {
+    'search': etree.XPath(f'//div[{_has_class("panel-heading")}] | //a[{_has_class("list-group-item")}]'),
+    'candidate': etree.XPath(
+        f'//div[@style="float:left;"] | //div[{_has_class("panel-body")}] | //a[{_has_class("btn")}]'
+        f' | //ul[{_has_class("vsubmenu")}]'
+    ),
+    'elections': etree.XPath('//div[@class="col-12 col-lg-9"]'),
+    'office': etree.XPath('//div[@class="col-12 col-lg-9"]'),
+    'legislator': etree.XPath(f'//div[{_has_class("panel-group")}]'),
+}
+
+
+def make_full_soup(text, page_type=None):
+    return BeautifulSoup(text, 'lxml')
+
+
+def make_xpath_soup(text, page_type=None):
+    # parse with lxml alone, then build Soup only from the (outermost) subtrees selected for the page type
+    xpath = PAGE_XPATHS.get(page_type, None)
+    if xpath is None or not text.strip():
+        return make_full_soup(text)
+
+    elems = xpath(html.document_fromstring(text))
+    selected = set(elems)
+    outermost = [elem for elem in elems if not any(ancestor in selected for ancestor in elem.iterancestors())]
+    body = ''.join(html.tostring(elem, encoding='unicode', with_tail=False) for elem in outermost)
+    return BeautifulSoup(f'<html><body>{body}</body></html>', 'lxml')
+
+
+# extraction backends, selectable per run: 'soup' builds a full BeautifulSoup tree of every page; 'xpath' uses
+# compiled XPath selectors to keep only the parts of each page type that are scraped
+EXTRACTION_BACKENDS = {
+    'soup': make_full_soup,
+    'xpath': make_xpath_soup,
+}
+
+
+def make_soup(text, page_type=None, extraction='soup'):
+    return EXTRACTION_BACKENDS[extraction](text, page_type)
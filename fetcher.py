@@ -0,0 +1,141 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock, Thread
+from time import sleep
+from urllib.parse import urlsplit
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cache import CachingFetcher
+from metrics import metrics
+from throttle import AdaptiveFetcher
+
+try:
+    import brotli  # noqa: F401 (urllib3 decodes br responses only if brotli is installed)
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+
+def create_session(pool_size=10, retries=3, backoff_factor=0.5):
+    # one keep-alive connection pool per run, shared by every scraper through its fetcher
+    retry = Retry(
+        total=retries, backoff_factor=backoff_factor, status_forcelist=(500, 502, 503, 504),
+        allowed_methods=('GET',), raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Accept-Encoding': ACCEPT_ENCODING})
+    return session
+
+
+def get_connection_stats(session):
+    # requests - connections is the number of requests that reused an open (already handshaken) connection
+    stats = {'requests': 0, 'connections': 0}
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            stats['requests'] += pool.num_requests
+            stats['connections'] += pool.num_connections
+    stats['reused'] = stats['requests'] - stats['connections']
+    return stats
+
+
+class Fetcher:
+    # blocking fetcher: one request at a time, with a fixed pause after each (the original behavior). Threads sharing
+    # it (e.g. a StagePipeline's stages) take turns, so the pause still separates every two requests
+    def __init__(self, delay=2, timeout=20, session=None):
+        self.delay = delay
+        self.timeout = timeout
+        self.session = session or create_session(pool_size=1)
+        self._lock = Lock()
+
+    def get(self, url, params=None, headers=None):
+        with self._lock:
+            r = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            sleep(self.delay)
+        metrics.add('fetcher', 'sleep_seconds', self.delay)
+        return r
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncFetcher:
+    # asyncio fetcher running its event loop in a background thread, so that synchronous scrapers running in
+    # several threads can share it. concurrency bounds the number of requests in flight; host_interval is the
+    # minimum spacing (in seconds) between the start of two requests to the same host
+    def __init__(self, concurrency=8, host_interval=0.5, timeout=20, session=None):
+        self.concurrency = concurrency
+        self.host_interval = host_interval
+        self.timeout = timeout
+        self.session = session or create_session(pool_size=concurrency)
+        self._host_locks = {}
+        self._host_last_request = {}
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+        self._thread = Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        self._semaphore = self._run(self._create_semaphore())
+
+    async def _create_semaphore(self):
+        return asyncio.Semaphore(self.concurrency)
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def fetch(self, url, params=None, headers=None):
+        async with self._semaphore:
+            await self._wait_for_host(urlsplit(url).netloc)
+            return await self.loop.run_in_executor(
+                None, partial(self.session.get, url, params=params, headers=headers, timeout=self.timeout)
+            )
+
+    async def _wait_for_host(self, host):
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self._host_last_request.get(host, 0) + self.host_interval - self.loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                metrics.add('fetcher', 'throttle_seconds', wait)
+            self._host_last_request[host] = self.loop.time()
+
+    def get(self, url, params=None, headers=None):
+        return self._run(self.fetch(url, params=params, headers=headers))
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.run_until_complete(self.loop.shutdown_default_executor())
+        self.loop.close()
+        self.session.close()
+
+
+def create_fetcher(concurrency=1, adaptive=False, retries=3, cache=None, conditional=False, pool_size=None, delay=2,
+                   host_interval=0.5, throttle=None):
+    # the fetcher of a run: a Fetcher (pausing `delay` seconds after each request) for one request at a time, else an
+    # AsyncFetcher with `concurrency` requests in flight, starting them `host_interval` seconds apart per host.
+    # adaptive=True wraps it in an AdaptiveFetcher instead of pausing, which makes the `retries` (honoring
+    # Retry-After) instead of the session, pacing requests by `throttle` (by default, an AdaptiveThrottle). With a
+    # ResponseCache, it's wrapped in a CachingFetcher, revalidating expired pages if conditional=True (incremental mode)
+    session = create_session(pool_size=max(pool_size or 0, concurrency), retries=0 if adaptive else retries)
+    fetcher = (
+        Fetcher(delay=0 if adaptive else delay, session=session) if concurrency == 1
+        else AsyncFetcher(concurrency=concurrency, host_interval=0 if adaptive else host_interval, session=session)
+    )
+    if adaptive:
+        fetcher = AdaptiveFetcher(fetcher, throttle=throttle, retries=retries)
+    if cache:
+        fetcher = CachingFetcher(fetcher, cache, conditional=conditional)
+    return fetcher
+
+
+def get_wrapped_fetcher(fetcher, fetcher_class):
+    # the fetcher of fetcher_class in a chain of fetchers wrapping each other (as .fetcher), or None
+    while fetcher is not None and not isinstance(fetcher, fetcher_class):
+        fetcher = getattr(fetcher, 'fetcher', None)
+    return fetcher
@@ -0,0 +1,55 @@
+import json
+import os
+from threading import Lock
+
+
+class Journal:
+    # append-only JSONL record of each researched candidate (result or error), written and fsynced as soon as the
+    # candidate is done, so that a crashed run can be resumed and its exports rebuilt from the journal
+    def __init__(self, path, resume=False):
+        self.path = path
+        self._lock = Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not resume and os.path.exists(path):
+            os.replace(path, path + '.bak')
+        self.file = open(path, 'a', encoding='utf-8')
+        if self.file.tell() and not self._ends_with_newline():
+            self.file.write('\n')  # terminate a line left partially written by a crash
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def _append(self, entry):
+        line = json.dumps(entry, default=str) + '\n'
+        with self._lock:
+            self.file.write(line)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def add_result(self, candidate, result, full_record):
+        self._append({'candidate': candidate, 'result': result, 'full_record': full_record})
+
+    def add_error(self, candidate, error_message):
+        self._append({'candidate': candidate, 'error_message': error_message})
+
+    def load(self):
+        # latest entry per candidate, in the order of those entries
+        entries = {}
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # partially written last line of a crashed run
+                entries.pop(entry['candidate'], None)
+                entries[entry['candidate']] = entry
+        return list(entries.values())
+
+    def get_completed_candidates(self):
+        return {entry['candidate'] for entry in self.load() if 'result' in entry}
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,95 @@
+import os
+import sys
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from pandas import read_csv
+from standin import Faults, StandinServer
+
+
+# fault profiles: name: Faults keyword arguments
+PROFILES = {
+    'clean': {},
+    'latency': {'latency': 0.2, 'latency_jitter': 0.3},
+    'faulty': {'latency': 0.1, 'latency_jitter': 0.2, 'error_rate': 0.05, 'throttle_rate': 0.05},
+    'slow': {'latency': 0.1, 'slow_body_rate': 0.2},
+}
+# the stand-in's port when a cache is kept between runs, as cached pages are keyed by their URLs
+CACHED_PORT = 8731
+
+
+def run(candidates=200, concurrency=8, profile='clean', host_interval=0.0, cache_path=None, pipeline_workers=None,
+        parse_workers=None, plan=False, adaptive=False, retries=3, store=False):
+    # researches and exports `candidates` made-up candidates with an Exporter pointed at a stand-in server (without
+    # IEs, which need vpap.org's scripts) and returns candidates per minute, along with the run's errors, fetcher and
+    # plan metrics and the server's stats. The Exporter runs in a temporary directory, with its journal, reports,
+    # name index, exports and (with store=True) store; cache_path, if set, is kept to reuse between runs
+    server = StandinServer(port=CACHED_PORT if cache_path else 0, faults=Faults(seed=0, **PROFILES[profile])).start()
+    os.environ['VPAP_HOMEPAGE'] = server.url
+    # imported only now, as scrapers (which task imports) reads VPAP_HOMEPAGE on import
+    from metrics import metrics
+    from task import Exporter
+
+    cache_path = os.path.abspath(cache_path) if cache_path else None
+    cwd = os.getcwd()
+    with TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            for directory in ('data', 'data_test'):
+                os.mkdir(directory)
+            # the Exporter's default year and chamber
+            with open('2017_lower_candidate_list.txt', 'w') as f:
+                f.write('\n'.join(f'Candidate {i}' for i in range(candidates)))
+            with open('mapper.txt', 'w') as f:
+                f.write('name:search_string')
+
+            ex = Exporter()
+            ex.concurrency = concurrency
+            ex.delay = ex.host_interval = host_interval
+            ex.adaptive = adaptive
+            ex.retries = retries
+            ex.cache_path = cache_path
+            ex.store_path = 'data/vpap.sqlite' if store else None
+            ex.pipeline_workers = pipeline_workers
+            ex.parse_workers = parse_workers
+            ex.plan = plan
+            ex.scrape_ie = False
+            start = perf_counter()
+            try:
+                ex.main()
+            finally:
+                elapsed = perf_counter() - start
+                server.close()
+            researched = len(read_csv(f'data_test/{ex.year}_{ex.chamber}_full_new.csv'))
+            errors_path = f'data_test/{ex.year}_{ex.chamber}_errors.csv'
+            errors = len(read_csv(errors_path)) if os.path.exists(errors_path) else 0
+        finally:
+            os.chdir(cwd)
+    stages = metrics.get_report()['stages']
+    return {
+        'candidates': candidates,
+        'researched': researched,
+        'errors': errors,
+        'seconds': round(elapsed, 2),
+        'candidates_per_minute': round(researched / elapsed * 60, 1),
+        'fetcher': stages.get('fetcher', {}),
+        'plan': stages.get('plan', {}),
+        'server': server.stats,
+    }
+
+
+def main():
+    # python loadtest.py [profile [candidates [concurrency [parse worker processes [plan [adaptive [retries
+    # [cache path]]]]]]]], e.g. python loadtest.py faulty 40 4 "" "" adaptive 3 cache/loadtest.sqlite
+    args = sys.argv[1:]
+    profile, candidates, concurrency, parse_workers, plan, adaptive, retries, cache_path = (
+        args + ['clean', '200', '8', '', '', '', '3', ''][len(args):]
+    )[:8]
+    print(run(
+        int(candidates), int(concurrency), profile, cache_path=cache_path or None,
+        parse_workers=int(parse_workers) if parse_workers else None, plan=plan == 'plan',
+        adaptive=adaptive == 'adaptive', retries=int(retries),
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import json
+import os
+from contextlib import contextmanager
+from threading import Lock, local
+from time import perf_counter, time
+
+
+METRIC_NAMES = (
+    'wall_seconds', 'requests', 'response_bytes', 'cache_hits', 'fetch_seconds', 'sleep_seconds',
+    'throttle_seconds', 'breaker_seconds', 'retries', 'parse_seconds', 'scrape_seconds', 'render_seconds',
+    'index_hits', 'index_misses', 'index_suggestions', 'search_retries', 'critical_path_seconds',
+    'sequential_seconds', 'prefetches', 'prefetch_hits', 'polls', 'not_modified', 'changes', 'deltas', 'errors',
+    'staleness_seconds',
+)
+
+
+class Metrics:
+    # per-stage (and per-candidate) counters and timings of a run: stages are the research stages and page types
+    # (search, candidate, elections, legislator, office, ie, dataframes), plus 'fetcher' for delays between requests,
+    # 'run' for a whole MultiCandidateResearcher.research and 'watch' for watch.RaceWatcher's polls. Whatever is
+    # recorded in a thread while it works on a candidate (see candidate()) is also added to that candidate's metrics
+    def __init__(self):
+        self._lock = Lock()
+        self._local = local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time()
+            self.stages = {}
+            self.candidates = {}
+
+    @contextmanager
+    def candidate(self, candidate):
+        previous = getattr(self._local, 'candidate', None)
+        self._local.candidate = candidate
+        try:
+            yield
+        finally:
+            self._local.candidate = previous
+
+    def add(self, stage, metric, value=1):
+        candidate = getattr(self._local, 'candidate', None)
+        with self._lock:
+            stage_metrics = self.stages.setdefault(stage, {})
+            stage_metrics[metric] = stage_metrics.get(metric, 0) + value
+            if candidate is not None:
+                candidate_metrics = self.candidates.setdefault(candidate, {}).setdefault(stage, {})
+                candidate_metrics[metric] = candidate_metrics.get(metric, 0) + value
+
+    @contextmanager
+    def timer(self, stage, metric='wall_seconds'):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, metric, perf_counter() - start)
+
+    def add_response(self, stage, response, seconds):
+        self.add(stage, 'requests')
+        self.add(stage, 'fetch_seconds', seconds)
+        self.add(stage, 'response_bytes', len(getattr(response, 'content', None) or response.text or ''))
+        if getattr(response, 'from_cache', False):
+            self.add(stage, 'cache_hits')
+
+    def get_report(self):
+        with self._lock:
+            return {
+                'started_at': self.started_at,
+                'wall_seconds': time() - self.started_at,
+                'stages': {stage: dict(stage_metrics) for stage, stage_metrics in self.stages.items()},
+                'candidates': {
+                    candidate: {stage: dict(stage_metrics) for stage, stage_metrics in candidate_metrics.items()}
+                    for candidate, candidate_metrics in self.candidates.items()
+                },
+            }
+
+    def write_report(self, path_prefix, labels=None):
+        # {path_prefix}.json with everything, and {path_prefix}.prom (per-stage totals) for the Prometheus node
+        # exporter's textfile collector
+        report = dict(self.get_report(), labels=labels or {})
+        if os.path.dirname(path_prefix):
+            os.makedirs(os.path.dirname(path_prefix), exist_ok=True)
+        with open(f'{path_prefix}.json', 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, default=str)
+
+        lines = []
+        label_text = ''.join(f',{key}="{value}"' for key, value in (labels or {}).items())
+        for metric in METRIC_NAMES:
+            stage_values = [
+                (stage, stage_metrics[metric]) for stage, stage_metrics in report['stages'].items()
+                if metric in stage_metrics
+            ]
+            if stage_values:
+                lines.append(f'# TYPE vpap_stage_{metric} gauge')
+                lines += [
+                    f'vpap_stage_{metric}{{stage="{stage}"{label_text}}} {value}' for stage, value in stage_values
+                ]
+        lines.append('# TYPE vpap_run_wall_seconds gauge')
+        lines.append(f'vpap_run_wall_seconds{{{label_text[1:]}}} {report["wall_seconds"]}')
+        # written then renamed, so that the collector never reads a partial file
+        with open(f'{path_prefix}.prom.tmp', 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(f'{path_prefix}.prom.tmp', f'{path_prefix}.prom')
+
+
+metrics = Metrics()
@@ -0,0 +1,248 @@
+import os
+import re
+import sqlite3
+import sys
+from glob import glob
+from threading import Lock
+from time import time
+from urllib.parse import urlsplit
+from pandas import read_csv
+from metrics import metrics
+from scrapers import HOMEPAGE, NoCandidatesFound, create_search_result
+
+
+NAME_SUFFIXES = {'jr', 'sr', 'ii', 'iii', 'iv'}
+# nickname: formal first name, so that "Joseph Lindsey" and "Lindsey, Joe" get the same key
+NICKNAMES = {
+    'al': 'albert', 'alex': 'alexander', 'andy': 'andrew', 'ben': 'benjamin', 'bill': 'william', 'billy': 'william',
+    'bob': 'robert', 'bobby': 'robert', 'chris': 'christopher', 'chuck': 'charles', 'charlie': 'charles',
+    'dan': 'daniel', 'danny': 'daniel', 'dave': 'david', 'dick': 'richard', 'don': 'donald', 'ed': 'edward',
+    'eddie': 'edward', 'greg': 'gregory', 'jack': 'john', 'jeff': 'jeffrey', 'jerry': 'gerald', 'jim': 'james',
+    'jimmy': 'james', 'joe': 'joseph', 'jon': 'jonathan', 'ken': 'kenneth', 'larry': 'lawrence', 'liz': 'elizabeth',
+    'matt': 'matthew', 'mike': 'michael', 'nick': 'nicholas', 'pat': 'patrick', 'rick': 'richard', 'rob': 'robert',
+    'ron': 'ronald', 'roz': 'roslyn', 'sam': 'samuel', 'steve': 'stephen', 'sue': 'susan', 'tim': 'timothy',
+    'tom': 'thomas', 'tony': 'anthony', 'will': 'william',
+}
+# a trigram suggestion must be at least this similar (Jaccard), and this much more similar than any other candidate
+MIN_SIMILARITY = 0.6
+MIN_SIMILARITY_MARGIN = 0.15
+
+
+def get_name_tokens(name):
+    # "Robert Orrock, Sr" and "Robert D. Orrock Sr." both become ['robert', 'orrock']
+    tokens = re.sub(r'[^a-z ]', ' ', name.lower().replace("'", '')).split()
+    return [token for token in tokens if len(token) > 1 and token not in NAME_SUFFIXES]
+
+
+def get_name_key(name):
+    return frozenset(get_name_tokens(name))
+
+
+def get_nickname_key(name):
+    return frozenset(NICKNAMES.get(token, token) for token in get_name_tokens(name))
+
+
+def get_trigrams(name_key):
+    return {f' {token} '[i:i + 3] for token in name_key for i in range(len(token))}
+
+
+def get_search_variants(candidate_name):
+    # search strings to try on VPAP, most specific first: the name as listed; without suffixes, punctuation and
+    # initials; first and last name only; then with formal first names
+    tokens = get_name_tokens(candidate_name)
+    variants = [
+        candidate_name.strip(),
+        ' '.join(tokens),
+        ' '.join(tokens[:1] + tokens[-1:]) if len(tokens) > 2 else '',
+        ' '.join(NICKNAMES.get(token, token) for token in tokens),
+    ]
+    unique_variants = []
+    for variant in variants:
+        if variant and variant.lower() not in [v.lower() for v in unique_variants]:
+            unique_variants.append(variant)
+    return unique_variants
+
+
+def get_candidate_path(candidate_page_link):
+    # stored without the host, so that an index works against a stand-in server too (see scrapers.HOMEPAGE)
+    return urlsplit(candidate_page_link).path
+
+
+class CandidateIndex:
+    # known VPAP candidates, by their VPAP names and the list names that found them, filled from earlier searches,
+    # crawls and exports. Names are resolved from it before searching VPAP, but only when they are the same name once
+    # normalized: the same tokens (lowercase, without suffixes, punctuation and initials), or the same tokens with
+    # formal first names for nicknames, of a single candidate page. Otherwise VPAP is searched, with variants of the
+    # name if it matches no one. Looser matches (one name's tokens a subset of the other's, or trigram similarity)
+    # can be someone else, e.g. "Mark Cole" and "Mark Coles", so they are only suggested in the error of a name
+    # that VPAP can't find
+    def __init__(self, path='cache/candidate_names.sqlite'):
+        self.path = path
+        self.names = {}  # candidate path: VPAP name (or, if not known, a list name)
+        self.paths_by_key = {}
+        self.paths_by_nickname_key = {}
+        self.trigrams_by_nickname_key = {}
+        self.nickname_keys_by_trigram = {}
+        self._lock = Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS names ('
+            'name TEXT, candidate_path TEXT, source TEXT, added_at REAL, PRIMARY KEY (name, candidate_path))'
+        )
+        self.conn.commit()
+        for name, candidate_path, source in self.conn.execute('SELECT name, candidate_path, source FROM names'):
+            self._index(name, candidate_path, source)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _index(self, name, candidate_path, source):
+        if source == 'vpap' or candidate_path not in self.names:
+            self.names[candidate_path] = name
+        self.paths_by_key.setdefault(get_name_key(name), set()).add(candidate_path)
+        nickname_key = get_nickname_key(name)
+        self.paths_by_nickname_key.setdefault(nickname_key, set()).add(candidate_path)
+        if nickname_key not in self.trigrams_by_nickname_key:
+            self.trigrams_by_nickname_key[nickname_key] = get_trigrams(nickname_key)
+            for trigram in self.trigrams_by_nickname_key[nickname_key]:
+                self.nickname_keys_by_trigram.setdefault(trigram, set()).add(nickname_key)
+
+    def add(self, name, candidate_page_link, source='vpap'):
+        self.add_many([(name, candidate_page_link)], source)
+
+    def add_many(self, names, source='vpap'):
+        # (name, candidate page link) pairs; source is 'vpap' for VPAP's own names, which are preferred in results
+        rows = [
+            (name.strip(), get_candidate_path(link), source, time())
+            for name, link in names if name and link and get_name_key(name)
+        ]
+        with self._lock:
+            self.conn.executemany('INSERT OR IGNORE INTO names VALUES (?, ?, ?, ?)', rows)
+            self.conn.commit()
+            for name, candidate_path, source, _ in rows:
+                self._index(name, candidate_path, source)
+
+    def add_from_exports(self, paths):
+        # the search strings and VPAP names of earlier `full` exports (e.g. data/2019_lower_full.csv)
+        for path in paths:
+            df = read_csv(path, usecols=['search_string', 'candidate_yoda_name', 'candidate_page_link']).dropna()
+            self.add_many(zip(df['candidate_yoda_name'], df['candidate_page_link']), 'vpap')
+            self.add_many(zip(df['search_string'], df['candidate_page_link']), 'export')
+
+    def resolve(self, candidate_name):
+        # (VPAP name, candidate path) of the single candidate whose normalized name is the same, or None
+        key = get_name_key(candidate_name)
+        nickname_key = get_nickname_key(candidate_name)
+        return self._match(key, (
+            lambda: self.paths_by_key.get(key),
+            lambda: self.paths_by_nickname_key.get(nickname_key),
+        ))
+
+    def suggest(self, candidate_name):
+        # (VPAP name, candidate path) of the single candidate the name loosely matches, or None; never resolved from
+        nickname_key = get_nickname_key(candidate_name)
+        return self._match(nickname_key, (
+            lambda: self._get_subset_paths(nickname_key),
+            lambda: self._get_similar_paths(nickname_key),
+        ))
+
+    def _match(self, key, get_paths_in_order):
+        if not key:
+            return None
+        with self._lock:
+            # each kind of match is only tried if the previous ones found no one
+            for get_paths in get_paths_in_order:
+                candidate_paths = get_paths()
+                if candidate_paths:
+                    if len(candidate_paths) > 1:
+                        return None
+                    candidate_path = next(iter(candidate_paths))
+                    return self.names[candidate_path], candidate_path
+        return None
+
+    def _get_subset_paths(self, nickname_key):
+        # e.g. "Michael P. Mullin" and "Mullin, Michael Patrick"; not for single names, which match too many people
+        candidate_paths = set()
+        for other_key, other_paths in self.paths_by_nickname_key.items():
+            if min(len(nickname_key), len(other_key)) > 1 and (nickname_key <= other_key or other_key <= nickname_key):
+                candidate_paths.update(other_paths)
+        return candidate_paths
+
+    def _get_similar_paths(self, nickname_key):
+        # the candidate whose name's trigrams are the most similar, if clearly more similar than any other's
+        trigrams = get_trigrams(nickname_key)
+        shared = {}
+        for trigram in trigrams:
+            for other_key in self.nickname_keys_by_trigram.get(trigram, ()):
+                shared[other_key] = shared.get(other_key, 0) + 1
+        similarities = {}
+        for other_key, count in shared.items():
+            similarity = count / (len(trigrams) + len(self.trigrams_by_nickname_key[other_key]) - count)
+            for candidate_path in self.paths_by_nickname_key[other_key]:
+                similarities[candidate_path] = max(similarities.get(candidate_path, 0), similarity)
+        ranked = sorted(similarities.items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] < MIN_SIMILARITY:
+            return set()
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < MIN_SIMILARITY_MARGIN:
+            return {candidate_path for candidate_path, _ in ranked[:2]}
+        return {ranked[0][0]}
+
+    def search(self, candidate_name, search):
+        # the candidate from the index if the name resolves, else search(variant) (a Searcher) for each of the
+        # name's variants in turn, until one finds a single candidate
+        resolved = self.resolve(candidate_name)
+        if resolved:
+            metrics.add('search', 'index_hits')
+            name, candidate_path = resolved
+            return create_search_result(candidate_name, name, HOMEPAGE + candidate_path)
+        metrics.add('search', 'index_misses')
+
+        first_exc = None
+        for i, variant in enumerate(get_search_variants(candidate_name)):
+            if i:
+                metrics.add('search', 'search_retries')
+            try:
+                searcher = search(variant)
+            except NoCandidatesFound as exc:
+                first_exc = first_exc or exc
+                continue
+            searcher.result['search_string'] = candidate_name.strip()
+            self.add(searcher.candidate_page_name, searcher.candidate_page_link, 'vpap')
+            self.add(candidate_name, searcher.candidate_page_link, 'search')
+            return searcher
+
+        if first_exc is None:
+            # a blank name (or one of only initials and punctuation) has no variants to search for
+            raise NoCandidatesFound(f'No search variants for {candidate_name!r}')
+        suggested = self.suggest(candidate_name)
+        if suggested:
+            # left to be checked by hand, e.g. by adding the list name to the index (add(..., source='export'))
+            metrics.add('search', 'index_suggestions')
+            raise NoCandidatesFound(f'{first_exc} Closest known candidate: {suggested[0]} ({HOMEPAGE}{suggested[1]}).')
+        raise first_exc
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    # python names.py [full export ...]: adds earlier exports (by default data/*_full.csv) to the index, then shows
+    # how the names that failed in data/*_errors.csv resolve
+    index = CandidateIndex()
+    index.add_from_exports(sys.argv[1:] or sorted(glob('data/*_full.csv')))
+    print(f'{len(index)} candidates indexed')
+    for path in sorted(glob('data/*_errors.csv')):
+        for candidate in read_csv(path)['candidate']:
+            resolved = index.resolve(candidate)
+            suggested = None if resolved else index.suggest(candidate)
+            print(
+                f'{candidate}: {resolved[0] if resolved else "-"}',
+                f'(suggested: {suggested[0]})' if suggested else '', get_search_variants(candidate)
+            )
+    index.close()
+
+
+if __name__ == '__main__':
+    main()
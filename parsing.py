@@ -0,0 +1,49 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from cache import CachedResponse
+from metrics import metrics
+from scrapers import DEFAULT_FETCHER
+
+
+class StaticFetcher:
+    # hands a scraper the response fetched by the parent process
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, params=None, headers=None):
+        return self.response
+
+
+def parse_page(scraper_class, args, response, extraction):
+    # runs in a worker process; the scraper deletes its soup once scraped, so only its records are sent back
+    return scraper_class(*args, fetcher=StaticFetcher(response), extraction=extraction)
+
+
+# workers are started on the first page, when the fetching threads (and the AsyncFetcher's event loop) are already
+# running; forking a process with threads can deadlock on locks held by them, so workers are started from a clean
+# forkserver process (or spawned, where there is no forkserver)
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class ParsePool:
+    # parses pages in worker processes, so that parsing isn't limited to the one core (and GIL) that the fetching
+    # threads share. Pages are still fetched by the calling thread, through its fetcher (cache, throttle, ...).
+    # parse_seconds is measured here, from submitting a page to getting its records back; what the scrapers record in
+    # the workers (e.g. their scrape_seconds) stays there, and is missing from the run report
+    def __init__(self, workers=None):
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(START_METHOD))
+
+    def scrape(self, scraper_class, *args, fetcher=None, extraction='soup'):
+        # scraper_class(*args, fetcher=fetcher, extraction=extraction), with the parsing done in a worker process
+        url, params = scraper_class.get_request(*args)
+        start = perf_counter()
+        r = (fetcher or DEFAULT_FETCHER).get(url, params=params)
+        metrics.add_response(scraper_class.page_type, r, perf_counter() - start)
+        response = CachedResponse(url, r.status_code, r.text)
+        with metrics.timer(scraper_class.page_type, 'parse_seconds'):
+            return self.executor.submit(parse_page, scraper_class, args, response, extraction).result()
+
+    def close(self):
+        self.executor.shutdown()
@@ -0,0 +1,115 @@
+from queue import Queue, Empty
+from threading import Thread, Lock
+from time import perf_counter
+
+
+DEFAULT_STAGE_WORKERS = {
+    'search': 2,
+    'candidate': 2,
+    'elections': 2,
+    'legislator': 2,
+    'ie': 4,  # mostly waiting on the IE index's browsers
+    'dataframes': 1,
+}
+
+
+class Stage:
+    def __init__(self, name, workers, queue_size):
+        self.name = name
+        self.workers = workers
+        self.queue = Queue(maxsize=queue_size)
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._lock = Lock()
+
+    def record(self, seconds, failed=False):
+        with self._lock:
+            self.processed += 1
+            self.failed += failed
+            self.busy_seconds += seconds
+
+
+class StagePipeline:
+    # streams candidates through the research stages (CandidateResearcher.STAGES). Every stage has its own workers and
+    # a bounded input queue, so a slow stage (e.g. waiting on IE rendering) applies backpressure to the stages before
+    # it without stopping them from working on other candidates
+    def __init__(self, create_researcher, stages, workers=None, queue_size=8):
+        self.create_researcher = create_researcher
+        workers = dict(DEFAULT_STAGE_WORKERS, **(workers or {}))
+        self.stages = [Stage(name, workers.get(name, 1), queue_size) for name in stages]
+        self.done = Queue()
+        self.started_at = None
+
+    def run(self, candidate_list, on_done, report_interval=None):
+        # on_done(candidate, researcher, exc) is called from the calling thread as each candidate finishes
+        self.started_at = perf_counter()
+        threads = [Thread(target=self._feed, args=(candidate_list,), daemon=True)]
+        for i, stage in enumerate(self.stages):
+            next_stage = self.stages[i + 1] if i + 1 < len(self.stages) else None
+            for _ in range(stage.workers):
+                threads.append(Thread(target=self._work, args=(stage, next_stage), daemon=True))
+        for thread in threads:
+            thread.start()
+
+        for _ in range(len(candidate_list)):
+            while True:
+                try:
+                    on_done(*self.done.get(timeout=report_interval))
+                    break
+                except Empty:
+                    self.print_stats()
+
+        for stage in self.stages:
+            for _ in range(stage.workers):
+                stage.queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def _feed(self, candidate_list):
+        for candidate in candidate_list:
+            self.stages[0].queue.put((candidate, None))
+
+    def _work(self, stage, next_stage):
+        while True:
+            item = stage.queue.get()
+            if item is None:
+                break
+
+            candidate, researcher = item
+            start = perf_counter()
+            try:
+                researcher = researcher or self.create_researcher(candidate)
+                researcher.run_stage(stage.name)
+            except Exception as exc:
+                stage.record(perf_counter() - start, failed=True)
+                self.done.put((candidate, None, exc))
+                continue
+            stage.record(perf_counter() - start)
+
+            if next_stage:
+                next_stage.queue.put((candidate, researcher))
+            else:
+                self.done.put((candidate, researcher, None))
+
+    def get_stats(self):
+        elapsed = perf_counter() - self.started_at
+        return [
+            {
+                'stage': stage.name,
+                'workers': stage.workers,
+                'queue_depth': stage.queue.qsize(),
+                'processed': stage.processed,
+                'failed': stage.failed,
+                'busy_seconds': round(stage.busy_seconds, 3),
+                'throughput_per_minute': round(stage.processed / elapsed * 60, 1) if elapsed else 0,
+            }
+            for stage in self.stages
+        ]
+
+    def print_stats(self):
+        for stats in self.get_stats():
+            print(
+                f"{stats['stage']:>10}: queue {stats['queue_depth']:>3}, processed {stats['processed']:>5} "
+                f"({stats['failed']} failed), {stats['throughput_per_minute']:>7}/min, {stats['workers']} workers"
+            )
@@ -0,0 +1,180 @@
+import json
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from threading import Lock
+from time import perf_counter
+from cache import get_cache_key
+from metrics import metrics
+from scrapers import HOMEPAGE
+
+
+# step: the steps it needs first. The candidate, elections and legislator pages are all derived from the candidate
+# page link found by search, so they are fetched together; IE needs the candidate's number and has_ie from its
+# (state) candidate page, and the races from its elections page
+CANDIDATE_PLAN = {
+    'search': (),
+    'candidate_page': ('search',),
+    'state_candidate_page': ('candidate_page',),
+    'elections_page': ('search',),
+    'legislator': ('search',),
+    'submit_ie': ('state_candidate_page', 'elections_page'),
+    'ie': ('submit_ie', 'legislator'),
+    'dataframes': ('ie',),
+}
+# per candidate: its candidate, elections and legislator pages, and a prefetched state candidate page
+MAX_PARALLEL_FETCHES = 4
+# the "As State/Local Candidate" button of a candidate page with a federal candidate page too (as found by
+# scrapers.CandidateScraper._get_state_and_federal_candidate_links)
+STATE_LINK_PATTERN = re.compile(r'<a\b[^>]*\bhref="(/candidates/[^"]*)"[^>]*>\s*As State/Local Candidate\s*</a>')
+
+
+def get_state_candidate_link(html):
+    if 'href="/candidates/federal/' not in html and 'As Federal Candidate' not in html:
+        return None
+    match = STATE_LINK_PATTERN.search(html)
+    return HOMEPAGE + match.group(1) if match else None
+
+
+def get_critical_path(plan, times):
+    # the chain of steps that the candidate's research actually waited on: from the step that finished last, back
+    # through the dependency that finished last at each step
+    step = max(times, key=lambda name: times[name][1])
+    path = [step]
+    while plan[step]:
+        step = max(plan[step], key=lambda name: times[name][1])
+        path.append(step)
+    return path[::-1]
+
+
+class PrefetchingFetcher:
+    # wraps a candidate's fetcher, so that a page can be requested before the scraper that needs it is built; the
+    # scraper then gets the prefetched response. The state candidate page linked from a federal candidate's page is
+    # prefetched as soon as that page arrives, while it is parsed; if it is that same page, it is reused
+    def __init__(self, fetcher, executor):
+        self.fetcher = fetcher
+        self.executor = executor
+        self.prefetched = {}
+        self.requested = set()
+        self.reused = set()
+        self._lock = Lock()
+
+    def prefetch(self, url, params=None):
+        key = get_cache_key(url, params)
+        with self._lock:
+            if key in self.requested:
+                return
+            self.requested.add(key)
+            self.prefetched[key] = self.executor.submit(self.fetcher.get, url, params=params)
+        metrics.add('plan', 'prefetches')
+
+    def get(self, url, params=None):
+        key = get_cache_key(url, params)
+        with self._lock:
+            self.requested.add(key)
+            future = self.prefetched.pop(key, None)
+        if future:
+            metrics.add('plan', 'prefetch_hits')
+            r = future.result()
+        else:
+            r = self.fetcher.get(url, params=params)
+        state_candidate_link = get_state_candidate_link(r.text or '')
+        if state_candidate_link == url and key not in self.reused:
+            # the state candidate page itself, which CandidateScraper is about to ask for again
+            future = Future()
+            future.set_result(r)
+            with self._lock:
+                self.reused.add(key)
+                self.prefetched[key] = future
+        elif state_candidate_link:
+            self.prefetch(state_candidate_link)
+        return r
+
+
+class FetchPlanner:
+    # runs each candidate's research steps as a dependency graph (CANDIDATE_PLAN) instead of one after another: every
+    # step starts as soon as the steps it needs are done, so pages that don't depend on each other are fetched in
+    # parallel. Records each candidate's critical path, the steps its research waited on, to find what bounds it
+    def __init__(self, workers=8, prefetch_workers=4, plan=CANDIDATE_PLAN):
+        self.plan = plan
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.prefetch_executor = ThreadPoolExecutor(max_workers=prefetch_workers)
+        self.reports = []
+        self._lock = Lock()
+
+    def create_fetcher(self, fetcher):
+        return PrefetchingFetcher(fetcher, self.prefetch_executor)
+
+    def run(self, cr):
+        # runs a CandidateResearcher's steps; raises the first step's exception, once no other step is running
+        start = perf_counter()
+        times = {}
+        remaining = dict(self.plan)
+        running = {}
+        exc = None
+        while (remaining and exc is None) or running:
+            for step, dependencies in list(remaining.items()):
+                if exc is None and all(dependency in times for dependency in dependencies):
+                    del remaining[step]
+                    running[self.executor.submit(self._run_step, cr, step, start)] = step
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                try:
+                    times[step] = future.result()
+                except Exception as step_exc:
+                    exc = exc or step_exc
+        if exc is not None:
+            raise exc
+        self._add_report(cr.candidate_name, times)
+
+    @staticmethod
+    def _run_step(cr, step, start):
+        step_start = perf_counter() - start
+        cr.run_stage(step)
+        return step_start, perf_counter() - start
+
+    def _add_report(self, candidate, times):
+        critical_path = get_critical_path(self.plan, times)
+        report = {
+            'candidate': candidate,
+            'critical_path': critical_path,
+            'critical_path_seconds': times[critical_path[-1]][1],
+            # what the same steps take one after another
+            'sequential_seconds': sum(end - start for start, end in times.values()),
+            'steps': {step: [round(start, 3), round(end, 3)] for step, (start, end) in times.items()},
+        }
+        with metrics.candidate(candidate):
+            metrics.add('plan', 'critical_path_seconds', report['critical_path_seconds'])
+            metrics.add('plan', 'sequential_seconds', report['sequential_seconds'])
+        with self._lock:
+            self.reports.append(report)
+
+    def get_summary(self):
+        with self._lock:
+            reports = list(self.reports)
+        if not reports:
+            return {}
+        critical_path_steps = {}
+        for report in reports:
+            for step in report['critical_path']:
+                critical_path_steps[step] = critical_path_steps.get(step, 0) + 1
+        return {
+            'candidates': len(reports),
+            'mean_critical_path_seconds': round(sum(r['critical_path_seconds'] for r in reports) / len(reports), 3),
+            'mean_sequential_seconds': round(sum(r['sequential_seconds'] for r in reports) / len(reports), 3),
+            # the number of candidates whose critical path went through each step
+            'critical_path_steps': critical_path_steps,
+        }
+
+    def write_report(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock:
+            reports = list(self.reports)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'summary': self.get_summary(), 'candidates': reports}, f, indent=2)
+
+    def close(self):
+        self.executor.shutdown()
+        self.prefetch_executor.shutdown()
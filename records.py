@@ -0,0 +1,136 @@
+class Record:
+    # compact, slotted result record. Fields are listed in output order in `fields`; a field that was never assigned
+    # is left out of as_dict(), the one conversion to the flat dicts that make up the CSV columns
+    __slots__ = ()
+    fields = ()
+
+    def __init__(self, **values):
+        for field, value in values.items():
+            setattr(self, field, value)
+
+    def get(self, field, default=None):
+        return getattr(self, field, default)
+
+    def copy(self):
+        record = object.__new__(type(self))
+        for cls in type(self).__mro__:
+            for slot in getattr(cls, '__slots__', ()):
+                if hasattr(self, slot):
+                    setattr(record, slot, getattr(self, slot))
+        return record
+
+    def as_dict(self):
+        result = {}
+        for field in self.fields:
+            try:
+                result[field] = getattr(self, field)
+            except AttributeError:
+                pass
+        return result
+
+
+class SearchResult(Record):
+    # the candidate a search found: Searcher's result, or a candidate found without searching VPAP (resolved by the
+    # CandidateIndex, or crawled from a district page, with its district_page_link), standing in for the Searcher
+    __slots__ = (
+        'search_string', 'candidate_yoda_name', 'candidate_page_link', 'elections_page_link', 'legislator_page_link',
+        'district_page_link',
+    )
+    fields = __slots__[:-1]
+
+    @property
+    def result(self):
+        return self.as_dict()
+
+
+class CandidateRow(Record):
+    __slots__ = ('name', 'winner', 'party', 'incumbency')
+    fields = __slots__
+
+
+class MoneyRaisedRow(CandidateRow):
+    __slots__ = ('money_raised_text', 'money_raised')
+    fields = __slots__ + CandidateRow.fields
+
+
+class CurrentElectionRow(CandidateRow):
+    __slots__ = ('spent_text', 'votes_text', 'voteshare_text', 'spent', 'votes', 'voteshare')
+    fields = __slots__ + CandidateRow.fields
+
+
+class IEAmounts(Record):
+    __slots__ = ('support_amount_text', 'support_amount', 'oppose_amount_text', 'oppose_amount')
+    fields = __slots__
+
+
+class Bio(Record):
+    # legislator page overview; labels not listed in fields are kept in `other`
+    __slots__ = (
+        'bio_political_party', 'bio_race', 'bio_gender', 'bio_age', 'bio_margin_of_victory', 'bio_birth_state',
+        'bio_region', 'bio_education_level', 'bio_undergrad_public_private', 'bio_attorney', 'bio_military',
+        'bio_occupation', 'bio_stocksinvestments', 'bio_real_estate', 'bio_member_since', 'bio_years_of_service',
+        'other',
+    )
+    fields = __slots__[:-1]
+
+    def __init__(self, **values):
+        self.other = {}
+        for field, value in values.items():
+            if field in self.fields:
+                setattr(self, field, value)
+            else:
+                self.other[field] = value
+
+    def as_dict(self):
+        result = super().as_dict()
+        result.update(self.other)
+        return result
+
+
+class CurrentElection(Record):
+    # "current election" panel of a candidate page; rows are (candidate or opponent, CurrentElectionRow)
+    __slots__ = ('election_office', 'election_rellink', 'election_date', 'rows')
+    fields = __slots__[:-1]
+
+    def __init__(self, **values):
+        self.rows = []
+        super().__init__(**values)
+
+    def as_dict(self):
+        result = super().as_dict()
+        for label, row in self.rows:
+            for key, value in row.as_dict().items():
+                result[f'{label}_{key}'] = value
+        return result
+
+
+class CandidatePage(Record):
+    __slots__ = (
+        'vpap_candidate_num', 'name', 'summary', 'has_ie', 'as_state_link', 'as_federal_link', 'current_election',
+    )
+    fields = __slots__[:-1]
+
+    def as_dict(self):
+        result = super().as_dict()
+        if self.get('current_election'):
+            result.update(self.current_election.as_dict())
+        return result
+
+
+class ElectionResult(Record):
+    # one general election of an elections page; rows are the D and R MoneyRaisedRows, flattened as
+    # {year}_{chamber}_{key}_{party}. ie_support/ie_oppose are only assigned when IEs were looked up
+    __slots__ = ('year', 'chamber', 'election_name', 'election_link', 'ie_support', 'ie_oppose', 'rows')
+    fields = ('election_name', 'election_link', 'ie_support', 'ie_oppose')
+
+    def __init__(self, **values):
+        self.rows = []
+        super().__init__(**values)
+
+    def as_dict(self):
+        prefix = f'{self.year}_{self.chamber}'
+        result = {f'{prefix}_{key}': value for key, value in super().as_dict().items()}
+        for row in self.rows:
+            for key, value in row.as_dict().items():
+                result[f'{prefix}_{key}_{row.party}'] = value
+        return result
@@ -0,0 +1,77 @@
+import json
+import os
+import sqlite3
+from threading import Lock
+from time import time
+from cache import DAY
+
+
+class PageRecorder:
+    # wraps a fetcher to record the pages (url, params) a candidate was scraped from
+    def __init__(self, fetcher):
+        self.fetcher = fetcher
+        self.pages = []
+
+    def get(self, url, params=None):
+        self.pages.append((url, params))
+        return self.fetcher.get(url, params=params)
+
+
+class RefreshedCandidate:
+    # stands in for a CandidateResearcher whose pages are all unchanged since its last scrape
+    def __init__(self, result, full_record):
+        self.result = result
+        self.full_record = full_record
+
+
+class RefreshState:
+    # last scrape of each candidate (the pages it came from and its result), for incremental refreshes: a candidate
+    # is scraped again only if one of its pages changed or its last scrape is older than max_age seconds. max_age must
+    # be longer than the time between refreshes, or every refresh is a full re-scrape
+    def __init__(self, path='cache/refresh.sqlite', max_age=30 * DAY):
+        self.path = path
+        self.max_age = max_age
+        self.refreshed = 0
+        self._lock = Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS candidates ('
+            'candidate TEXT PRIMARY KEY, pages TEXT, result TEXT, full_record TEXT, scraped_at REAL, checked_at REAL)'
+        )
+        self.conn.commit()
+
+    def get_unchanged(self, candidate, fetcher):
+        # the previous result if the candidate's last scrape is recent enough and none of its pages changed
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT pages, result, full_record, scraped_at FROM candidates WHERE candidate = ?', (candidate,)
+            ).fetchone()
+        if not row or time() - row[3] >= self.max_age:
+            return None
+
+        pages, result, full_record, _ = row
+        if not all(fetcher.is_unchanged(url, params) for url, params in json.loads(pages)):
+            return None
+
+        with self._lock:
+            self.conn.execute('UPDATE candidates SET checked_at = ? WHERE candidate = ?', (time(), candidate))
+            self.conn.commit()
+            self.refreshed += 1
+        return RefreshedCandidate(json.loads(result), json.loads(full_record))
+
+    def put(self, candidate, pages, result, full_record):
+        now = time()
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO candidates VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    candidate, json.dumps(pages), json.dumps(result, default=str),
+                    json.dumps(full_record, default=str), now, now,
+                )
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
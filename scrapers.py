@@ -1,11 +1,39 @@
+import json
+import os
 from abc import abstractmethod
-from requests import get
-from bs4 import BeautifulSoup
-from time import sleep
-from selenium.common.exceptions import NoSuchElementException
-
-
-HOMEPAGE = 'https://www.vpap.org'
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import perf_counter
+from urllib.parse import parse_qs, urlsplit
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions
+from selenium.webdriver.support.ui import WebDriverWait
+from extraction import make_soup
+from fetcher import Fetcher
+from metrics import metrics
+from records import (
+    Bio, CandidatePage, CandidateRow, CurrentElection, CurrentElectionRow, ElectionResult, IEAmounts, MoneyRaisedRow,
+    SearchResult,
+)
+
+
+# set VPAP_HOMEPAGE to scrape a stand-in server instead (see standin.py)
+HOMEPAGE = os.environ.get('VPAP_HOMEPAGE', 'https://www.vpap.org').rstrip('/')
+# returns [href, amount text] for every bar of the IE chart in one round trip (fast mode)
+IE_BARLINKS_SCRIPT = '''
+return JSON.stringify(Array.from(document.querySelectorAll('#ie_details #svgchart svg .barlink')).map(function (a) {
+    var href = a.getAttribute('href') || a.getAttribute('xlink:href') || '';
+    var amount = a.querySelector('.g_rect .amount');
+    return [href, amount ? amount.textContent : null];
+}));
+'''
+DEFAULT_FETCHER = Fetcher()
+
+
+class NoCandidatesFound(AssertionError):
+    # a search that matched no candidate (rather than several), which another spelling of the name may fix
+    pass
 
 
 def safe_int(text):
@@ -49,23 +77,63 @@ def get_text_from_elem(elem, result=None):
         text = result
     return text
 
+def get_elections_page_link(candidate_page_link):
+    if candidate_page_link.endswith('/'):
+        return candidate_page_link + 'elections/'
+    return candidate_page_link + '/elections/'
+
+def get_legislator_page_link(candidate_page_link):
+    return candidate_page_link.replace('candidates', 'legislators')
+
+def create_search_result(search_string, candidate_name, candidate_page_link, **values):
+    # a SearchResult with the links Searcher derives from the candidate page link
+    return SearchResult(
+        search_string=search_string.strip(), candidate_yoda_name=candidate_name,
+        candidate_page_link=candidate_page_link, elections_page_link=get_elections_page_link(candidate_page_link),
+        legislator_page_link=get_legislator_page_link(candidate_page_link), **values
+    )
+
+def find_current_election_elem(soup):
+    # comment in HTML for this elem: shows the next upcoming election, unless there was an election recently,
+    # in which case it displays the results
+    show_all_elections_link_elem = soup.find('a', text=lambda x: 'Show all elections for' in str(x))
+    if show_all_elections_link_elem:
+        return show_all_elections_link_elem.find_parent('div', class_='panel-body')
+
 
 class Requester:
-    def __init__(self, url, params=None):
-        r = get(url, params=params, timeout=20)
-        sleep(2)
-        self.soup = BeautifulSoup(r.text, 'lxml')
+    page_type = None
+
+    @classmethod
+    def get_request(cls, link, *args):
+        # (url, params) of the page that a scraper built with these arguments fetches
+        return link, None
+
+    def __init__(self, url, params=None, fetcher=None, extraction='soup'):
+        start = perf_counter()
+        r = (fetcher or DEFAULT_FETCHER).get(url, params=params)
+        metrics.add_response(self.page_type, r, perf_counter() - start)
+        with metrics.timer(self.page_type, 'parse_seconds'):
+            self.soup = make_soup(r.text, self.page_type, extraction)
         if not r.ok or not self.soup:
             raise AssertionError('Bad request and/or bad Soup')
 
 
 class Searcher(Requester):
-    def __init__(self, candidate_name):
+    page_type = 'search'
+
+    @classmethod
+    def get_request(cls, candidate_name, *args):
+        return HOMEPAGE + '/search/', {'q': candidate_name.strip().lower()}
+
+    def __init__(self, candidate_name, fetcher=None, extraction='soup'):
         self.search_string = candidate_name.strip()
         self.candidate_page_link = ''
         self.candidate_page_name = None
-        super().__init__(url=HOMEPAGE + '/search/', params={'q': self.search_string.lower()})
-        self._search()
+        url, params = self.get_request(candidate_name)
+        super().__init__(url=url, params=params, fetcher=fetcher, extraction=extraction)
+        with metrics.timer(self.page_type, 'scrape_seconds'):
+            self._search()
 
     def _search(self):
         self._get_candidate_panel_heading()
@@ -73,19 +141,15 @@ class Searcher(Requester):
         self._get_candidate_page_link_and_name()
         self._get_elections_page_link()
         self._get_legislator_page_link()
-        self.result = {
-            'search_string': self.search_string,
-            'candidate_yoda_name': self.candidate_page_name,
-            'candidate_page_link': self.candidate_page_link,
-            'elections_page_link': self.elections_page_link,
-            'legislator_page_link': self.legislator_page_link,
-        }
+        self.result = create_search_result(
+            self.search_string, self.candidate_page_name, self.candidate_page_link
+        ).result
         del self.search_string, self.soup, self.candidates_panel_heading, self.candidates_record_count
 
     def _get_candidate_panel_heading(self):
         self.candidates_panel_heading = self.soup.find('div', class_='panel-heading candidates')
         if not self.candidates_panel_heading:
-            raise AssertionError(f'No candidates found for search string "{self.search_string}".')
+            raise NoCandidatesFound(f'No candidates found for search string "{self.search_string}".')
 
     def _get_candidate_record_count(self):
         self.candidates_record_count = self.candidates_panel_heading.find('span', class_='badge')
@@ -104,38 +168,43 @@ class Searcher(Requester):
             self.candidate_page_link = HOMEPAGE + candidate_page_box.get('href', '')
             self.candidate_page_name = candidate_page_box.find('span', class_='linklike').text
         else:
-            raise AssertionError(f'No candidate pages found for search query "{self.search_string}".')
+            raise NoCandidatesFound(f'No candidate pages found for search query "{self.search_string}".')
 
     def _get_elections_page_link(self):
-        if self.candidate_page_link.endswith('/'):
-            self.elections_page_link = self.candidate_page_link + 'elections/'
-        else:
-            self.elections_page_link = self.candidate_page_link + '/elections/'
+        self.elections_page_link = get_elections_page_link(self.candidate_page_link)
 
     def _get_legislator_page_link(self):
-        self.legislator_page_link = self.candidate_page_link.replace('candidates', 'legislators')
+        self.legislator_page_link = get_legislator_page_link(self.candidate_page_link)
 
 
 class LegislatorScraper(Requester):
-    def __init__(self, legislator_page_link):
-        self.bio = {}
+    page_type = 'legislator'
+
+    def __init__(self, legislator_page_link, fetcher=None, extraction='soup'):
+        self.bio = Bio()
         try:
-            super().__init__(url=legislator_page_link)
-            self._scrape()
+            super().__init__(url=legislator_page_link, fetcher=fetcher, extraction=extraction)
+            with metrics.timer(self.page_type, 'scrape_seconds'):
+                self._scrape()
         except AssertionError:
-            pass  # candidate was never a legislator
+            # candidate was never a legislator; what's left of the page goes, as in a ParsePool the scraper is
+            # pickled back to the parent
+            self.__dict__.pop('soup', None)
+            self.__dict__.pop('bio_attributes', None)
 
     def _scrape(self):
+        self.bio_attributes = {}
         self._get_bio_overview()
         try:
             self._adjust_bio_length_of_service()
         except KeyError:
-            self.bio.update({
+            self.bio_attributes.update({
                 'bio_member_since': None,
                 'bio_years_of_service': None,
             })
+        self.bio = Bio(**self.bio_attributes)
 
-        del self.soup
+        del self.soup, self.bio_attributes
 
     def _get_bio_overview(self):
         panel = self.soup.find('div', class_='panel-group').find('div', class_='panel-body').find(
@@ -148,33 +217,31 @@ class LegislatorScraper(Requester):
                     bio_attribute_name_adjusted = ('bio_' + bio_attribute_name[:-1].strip().lower()
                                                    .replace(' ', '_').replace('/', '').replace('__', '_'))
                     bio_attribute_value = get_text_from_elem(attr.find('strong'))
-                    self.bio.update({bio_attribute_name_adjusted: bio_attribute_value})
+                    self.bio_attributes.update({bio_attribute_name_adjusted: bio_attribute_value})
 
     def _adjust_bio_length_of_service(self):
-        bio_member_since, bio_years_of_service = self.bio['bio_length_of_service'].split(';', 1)
+        bio_member_since, bio_years_of_service = self.bio_attributes['bio_length_of_service'].split(';', 1)
         bio_member_since = bio_member_since.replace('Member since ', '')
         bio_years_of_service = bio_years_of_service.replace(' years of service', '')
-        self.bio.update({
+        self.bio_attributes.update({
             'bio_member_since': safe_int(bio_member_since),
             'bio_years_of_service': safe_int(bio_years_of_service),
         })
-        del self.bio['bio_length_of_service']
+        del self.bio_attributes['bio_length_of_service']
 
 
 class CandidateScraper(Requester):
-    def __init__(self, candidate_page_link):
+    page_type = 'candidate'
+
+    def __init__(self, candidate_page_link, fetcher=None, extraction='soup'):
         self.candidate_page_link = candidate_page_link
-        self.vpap_candidate_num = None
-        self.name = None
-        self.summary = None
-        self.has_ie = None
-        self.as_state_link = None
-        self.as_federal_link = None
-        super().__init__(url=self.candidate_page_link)
-        self._scrape()
+        self.record = CandidatePage(**dict.fromkeys(CandidatePage.fields))
+        super().__init__(url=self.candidate_page_link, fetcher=fetcher, extraction=extraction)
+        with metrics.timer(self.page_type, 'scrape_seconds'):
+            self._scrape()
 
     def _scrape(self):
-        self.vpap_candidate_num = self.candidate_page_link.split('/candidates/', 1)[1].split('/', 1)[0]
+        self.record.vpap_candidate_num = self.candidate_page_link.split('/candidates/', 1)[1].split('/', 1)[0]
         self.summary_box = self.soup.find('div', {'style': 'float:left;'})
         self._get_name()
         self._get_summary_data()
@@ -187,13 +254,12 @@ class CandidateScraper(Requester):
     def _get_name(self):
         name_box = self.summary_box.find('h3', {'style': 'margin-top:0;'})
         if name_box:
-            self.name = name_box.text
+            self.record.name = name_box.text
 
     def _get_summary_data(self):
         self.summary_para_box = self.summary_box.find('p')
         if self.summary_para_box:
-            self.summary = self.summary_para_box.text
-            self.summary = self.summary.strip().split('\n')[0].strip()
+            self.record.summary = self.summary_para_box.text.strip().split('\n')[0].strip()
 
     def _get_state_and_federal_candidate_links(self):
         federal_button_elem = self.soup.find(
@@ -208,8 +274,8 @@ class CandidateScraper(Requester):
             statelocal_button_elem = self.soup.find(
                 'a', class_='btn', attrs={'type': 'button'}, text='As State/Local Candidate'
             )
-            self.as_federal_link = HOMEPAGE + federal_button_elem.get('href', None)
-            self.as_state_link = HOMEPAGE + statelocal_button_elem.get('href', None)
+            self.record.as_federal_link = HOMEPAGE + federal_button_elem.get('href', None)
+            self.record.as_state_link = HOMEPAGE + statelocal_button_elem.get('href', None)
 
     def _get_sidebar_menu(self):
         self.sidebar_menu = self.soup.find('ul', class_='vsubmenu')
@@ -220,15 +286,14 @@ class CandidateScraper(Requester):
 
     def _get_ie_link(self):
         if self.sidebar_menu:
-            self.has_ie = bool(self.sidebar_menu.find('li', text='Independent Expenditures'))
+            self.record.has_ie = bool(self.sidebar_menu.find('li', text='Independent Expenditures'))
 
     def _get_current_election_data(self):
-        # comment in HTML for this elem: shows the next upcoming election, unless there was an election recently,
-        # in which case it displays the results
-        show_all_elections_link_elem = self.soup.find('a', text=lambda x: 'Show all elections for' in str(x))
-        if show_all_elections_link_elem:
-            current_election_elem = show_all_elections_link_elem.find_parent('div', class_='panel-body')
-            self.__dict__.update(CandidateCurrentElectionScraper(current_election_elem, self.name).result)
+        current_election_elem = find_current_election_elem(self.soup)
+        if current_election_elem:
+            self.record.current_election = CandidateCurrentElectionScraper(
+                current_election_elem, self.record.name
+            ).record
 
 
 class CandidateCurrentElectionScraper:
@@ -236,7 +301,7 @@ class CandidateCurrentElectionScraper:
         self.current_election_elem = current_election_elem
         self.candidate_name = candidate_name
         self.candidate_rows = []
-        self.result = {}
+        self.record = CurrentElection()
         self._scrape()
         del self.candidate_rows
 
@@ -251,32 +316,68 @@ class CandidateCurrentElectionScraper:
             if get_text_from_elem(election_office_rellink_elem):
                 office_text = election_office_rellink_elem.text.strip()
                 if office_text:
-                    self.result.update({
-                        'election_office': ' '.join(i.strip() for i in office_text.split('\n')),
-                        'election_rellink': election_office_rellink_elem.get('href', None),
-                    })
+                    self.record.election_office = ' '.join(i.strip() for i in office_text.split('\n'))
+                    self.record.election_rellink = election_office_rellink_elem.get('href', None)
             election_date_elem = election_office_header_elem.find('span', class_='small')
-            self.result.update({'election_date': get_text_from_elem(election_date_elem)})
+            self.record.election_date = get_text_from_elem(election_date_elem)
 
     def _scrape_table(self):
         table = self.current_election_elem.find('table', class_='table')
         if table:
             self.candidate_rows = table.find('tbody').find_all('tr')[:2]
             for candidate_row in self.candidate_rows:
-                row_scraper = CurrentElectionCandidateRowScraper(candidate_row)
-                if row_scraper.name:
-                    last_name = row_scraper.name.split(',', 1)[0]
+                row = CurrentElectionCandidateRowScraper(candidate_row).record
+                if row.name:
+                    last_name = row.name.split(',', 1)[0]
                     candidate = 'candidate' if last_name.lower() in self.candidate_name.lower() else 'opponent'
-                    for key, value in CurrentElectionCandidateRowScraper(candidate_row).__dict__.items():
-                        self.result.update({f'{candidate}_{key}': value})
+                    self.record.rows.append((candidate, row))
 
 
-class ElectionsScraper(Requester):
-    def __init__(self, elections_page_link, **kwargs):
+class CandidateElections:
+    # a candidate's general elections (ElectionResults), flattened into the race columns by `result`, with their IE
+    # amounts looked up in the background; scraped from the candidate's elections page, or taken from a crawled
+    # district page (see crawler.DistrictCrawler)
+    def __init__(self, elections=(), **kwargs):
         self.kwargs = kwargs
-        self.result = {}
-        super().__init__(url=elections_page_link)
-        self._scrape()
+        self.elections = list(elections)
+        self.pending_ie = []
+
+    @property
+    def result(self):
+        result = {}
+        for election in self.elections:
+            result.update(election.as_dict())
+        return result
+
+    def _submit_ie(self, election):
+        if self.kwargs.get('has_ie', None) and self.kwargs.get('ie_index', None):
+            # IE amounts are scraped in the background; placeholders keep the column order until resolve_ie()
+            self.pending_ie.append((election, self.kwargs['ie_index'].submit(election.election_link)))
+            election.ie_support = None
+            election.ie_oppose = None
+
+    def submit_ie(self, **kwargs):
+        # for elections gathered without IE arguments (e.g. scraped in another process, see parsing.ParsePool)
+        self.kwargs.update(kwargs)
+        for election in self.elections:
+            self._submit_ie(election)
+
+    def resolve_ie(self):
+        for election, future in self.pending_ie:
+            election.ie_support, election.ie_oppose = IEIndex.get_candidate_amounts(
+                future.result(), self.kwargs.get('vpap_candidate_num', None)
+            )
+        self.pending_ie = []
+
+
+class ElectionsScraper(CandidateElections, Requester):
+    page_type = 'elections'
+
+    def __init__(self, elections_page_link, fetcher=None, extraction='soup', **kwargs):
+        CandidateElections.__init__(self, **kwargs)
+        Requester.__init__(self, url=elections_page_link, fetcher=fetcher, extraction=extraction)
+        with metrics.timer(self.page_type, 'scrape_seconds'):
+            self._scrape()
 
     def _scrape(self):
         self._get_election_data_boxes_and_tables()
@@ -304,62 +405,115 @@ class ElectionsScraper(Requester):
             else:
                 chamber = 'other'
 
-            election_link = HOMEPAGE + election_data_link_box.get('href', None)
-            self.result.update({
-                f'{year}_{chamber}_election_name': election_name,
-                f'{year}_{chamber}_election_link': election_link,
-            })
-
-            if self.kwargs.get('has_ie', None) and self.kwargs.get('driver', None):
-                ies = IEScraper(self.kwargs['driver'], self.kwargs.get('vpap_candidate_num', None), election_link)
-                self.result.update({
-                    f'{year}_{chamber}_ie_support': ies.support_amount,
-                    f'{year}_{chamber}_ie_oppose': ies.oppose_amount,
-                })
+            election = ElectionResult(
+                year=year, chamber=chamber, election_name=election_name,
+                election_link=HOMEPAGE + election_data_link_box.get('href', None),
+            )
+            self.elections.append(election)
+            self._submit_ie(election)
 
             candidate_rows = table.find('tbody').find_all('tr')[:2]
             for candidate_row in candidate_rows:
-                candidate_data = MoneyRaisedCandidateRowScraper(candidate_row).__dict__
-                if candidate_data["party"] in {'D', 'R'}:
-                    candidate_data_rekeyed = {}
-                    for key, value in candidate_data.items():
-                        candidate_data_rekeyed.update({f'{year}_{chamber}_{key}_{candidate_data["party"]}': value})
-                        self.result.update(candidate_data_rekeyed)
+                row = MoneyRaisedCandidateRowScraper(candidate_row).record
+                self._add_candidate_row(election, candidate_row, row)
+
+    def _add_candidate_row(self, election, candidate_row, row):
+        if row.party in {'D', 'R'}:
+            election.rows.append(row)
+
+
+class DistrictElectionsScraper(ElectionsScraper):
+    # a district's elections page for one year (/offices/<office>-<district>/elections/?year_and_type=<year>regular),
+    # which also links to the candidate page of everyone in the race
+    page_type = 'office'
+
+    def __init__(self, district_page_link, fetcher=None, extraction='soup'):
+        self.candidates = []
+        super().__init__(district_page_link, fetcher=fetcher, extraction=extraction)
+
+    def _add_candidate_row(self, election, candidate_row, row):
+        super()._add_candidate_row(election, candidate_row, row)
+        candidate_link_elem = candidate_row.find('a', {'href': lambda x: '/candidates/' in str(x)})
+        if row.name and candidate_link_elem:
+            self.candidates.append({
+                'name': row.name,
+                'candidate_page_link': HOMEPAGE + candidate_link_elem.get('href', ''),
+                'year': election.year,
+                'chamber': election.chamber,
+            })
+
+
+class IEIndex:
+    # per-run index of IE amounts for every candidate in each election's chart, keyed by election link, so that each
+    # election page is rendered once no matter how many of its candidates are researched. Elections are scraped in
+    # the background on a DriverPool, one election per browser at a time
+    def __init__(self, driver_pool):
+        self.driver_pool = driver_pool
+        self.elections = {}
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(max_workers=driver_pool.size)
+
+    def submit(self, election_link):
+        with self._lock:
+            future = self.elections.get(election_link, None)
+            if future is None or (future.done() and future.exception()):
+                future = self._executor.submit(self._scrape, election_link)
+                self.elections[election_link] = future
+            return future
+
+    def _scrape(self, election_link):
+        with self.driver_pool.driver() as driver:
+            return IEScraper(driver, election_link, fast=self.driver_pool.fast).amounts
+
+    def get_amounts(self, election_link, vpap_candidate_num):
+        return self.get_candidate_amounts(self.submit(election_link).result(), vpap_candidate_num)
+
+    @staticmethod
+    def get_candidate_amounts(amounts, vpap_candidate_num):
+        candidate_amounts = amounts.get(str(vpap_candidate_num), None) or IEAmounts()
+        return candidate_amounts.get('support_amount') or 0, candidate_amounts.get('oppose_amount') or 0
+
+    def close(self):
+        self._executor.shutdown()
+        self.driver_pool.close()
 
 
 class IEScraper:
-    def __init__(self, driver, vpap_candidate_num, election_link):
+    # fast=True expects a driver from create_driver(fast=True): it waits only for the chart's SVG and reads all bars
+    # with a single script instead of a WebDriver round trip per element
+    def __init__(self, driver, election_link, fast=False, wait_timeout=10):
         self.driver = driver
-        self.vpap_candidate_num = vpap_candidate_num
         self.election_link = election_link
+        self.fast = fast
+        self.wait_timeout = wait_timeout
         self.barlinks = []
-        self.support_amount_text = None
-        self.support_amount = None
-        self.oppose_amount_text = None
-        self.oppose_amount = None
-        self._get()
+        self.amounts = {}
+        metrics.add('ie', 'requests')
+        with metrics.timer('ie', 'render_seconds'):
+            self._get()
 
     def _get(self):
         self._get_ie_details_elem()
-        if self.details_elem:
+        if self.details_elem and self.fast:
+            self._get_barlink_amounts_with_script()
+        elif self.details_elem:
             self._get_svg_elem()
             self._get_barlinks()
             self._get_amounts()
-            del self.details_elem, self.barlink_elems, self.barlinks
-        self._adjust_null_amounts_to_zero()
-        del self.vpap_candidate_num, self.election_link, self.driver
+            del self.barlink_elems
+        del self.election_link, self.driver, self.details_elem, self.barlinks
 
     def _get_ie_details_elem(self):
         self.driver.get(self.election_link)
         try:
-            self.details_elem = self.driver.find_element_by_id('ie_details')
+            self.details_elem = self.driver.find_element(By.ID, 'ie_details')
         except NoSuchElementException:
             self.details_elem = None
 
     def _get_svg_elem(self):
-        chart_elem = self.details_elem.find_element_by_id('svgchart')
-        svg_elem = chart_elem.find_element_by_tag_name('svg')
-        self.barlink_elems = svg_elem.find_elements_by_class_name('barlink')
+        chart_elem = self.details_elem.find_element(By.ID, 'svgchart')
+        svg_elem = chart_elem.find_element(By.TAG_NAME, 'svg')
+        self.barlink_elems = svg_elem.find_elements(By.CLASS_NAME, 'barlink')
 
     def _get_barlinks(self):
         for barlink_elem in self.barlink_elems:
@@ -380,40 +534,45 @@ class IEScraper:
 
     def _get_amounts(self):
         for barlink, barlink_elem in self.barlinks:
-            if f'candidate={self.vpap_candidate_num}' in barlink:
-
-                for position in ('support', 'oppose'):
-                    if f'position={position}' in barlink:
-                        g_elem = barlink_elem.find_element_by_class_name('g_rect')
-                        text_elem = g_elem.find_element_by_class_name('amount')
-
-                        text_amount = text_elem.text
-                        amount = money_to_float(text_amount)
-                        self.__dict__.update({
-                            f'{position}_amount_text': text_amount,
-                            f'{position}_amount': amount,
-                        })
-
-    def _adjust_null_amounts_to_zero(self):
-        if not self.support_amount_text:
-            self.support_amount_text = 0
-        if not self.support_amount:
-            self.support_amount = 0
-        if not self.oppose_amount_text:
-            self.oppose_amount_text = 0
-        if not self.oppose_amount:
-            self.oppose_amount = 0
+            vpap_candidate_num, position = self._parse_barlink(barlink)
+            if vpap_candidate_num and position in ('support', 'oppose'):
+                g_elem = barlink_elem.find_element(By.CLASS_NAME, 'g_rect')
+                text_elem = g_elem.find_element(By.CLASS_NAME, 'amount')
+                self._add_amount(vpap_candidate_num, position, text_elem.text)
+
+    def _get_barlink_amounts_with_script(self):
+        try:
+            WebDriverWait(self.driver, self.wait_timeout).until(
+                expected_conditions.presence_of_element_located((By.CSS_SELECTOR, '#svgchart svg'))
+            )
+        except TimeoutException:
+            return  # no chart rendered
+
+        for barlink, text_amount in json.loads(self.driver.execute_script(IE_BARLINKS_SCRIPT)):
+            vpap_candidate_num, position = self._parse_barlink(barlink)
+            if vpap_candidate_num and position in ('support', 'oppose'):
+                self._add_amount(vpap_candidate_num, position, text_amount)
+
+    @staticmethod
+    def _parse_barlink(barlink):
+        # every bar in the chart links to ...?election=<num>&candidate=<num>&position=<support|oppose>
+        query = parse_qs(urlsplit(barlink or '').query)
+        return query.get('candidate', [None])[0], query.get('position', [None])[0]
+
+    def _add_amount(self, vpap_candidate_num, position, text_amount):
+        amounts = self.amounts.setdefault(vpap_candidate_num, IEAmounts())
+        setattr(amounts, f'{position}_amount_text', text_amount)
+        setattr(amounts, f'{position}_amount', money_to_float(text_amount))
 
 
 class CandidateRowScraper:
+    record_class = CandidateRow
+
     def __init__(self, candidate_row):
         self.row = candidate_row
         self.candidate_cell = None
         self.remaining_cells = []
-        self.name = None
-        self.winner = None
-        self.party = None
-        self.incumbency = None
+        self.record = self.record_class(**dict.fromkeys(self.record_class.fields))
         self._scrape()
 
     def _scrape(self):
@@ -437,18 +596,19 @@ class CandidateRowScraper:
                     'withdrawn candidates' in lower_ctext or 'did not seek' in lower_ctext
                     or 'sought other office' in lower_ctext or 'failed to' in lower_ctext
                 ):
-                    self.winner = bool(self.candidate_cell.find('span', class_='badge'))
+                    self.record.winner = bool(self.candidate_cell.find('span', class_='badge'))
                     candidate_items = [i.strip() for i in self.candidate_cell.text.strip().split('\n')]
                     if len(candidate_items) > 1:
-                        self.name, self.party = candidate_items[:2]
+                        name, party = candidate_items[:2]
 
-                        if self.name.endswith('*'):
-                            self.incumbency = True
-                            self.name = self.name.replace('*', '').strip()
+                        if name.endswith('*'):
+                            self.record.incumbency = True
+                            name = name.replace('*', '').strip()
                         else:
-                            self.incumbency = False
+                            self.record.incumbency = False
 
-                        self.party = self.party.replace('(', '').replace(')', '')
+                        self.record.name = name
+                        self.record.party = party.replace('(', '').replace(')', '')
 
     @abstractmethod
     def _get_remaining_cells(self):
@@ -460,10 +620,10 @@ class CandidateRowScraper:
 
 
 class MoneyRaisedCandidateRowScraper(CandidateRowScraper):
+    record_class = MoneyRaisedRow
+
     def __init__(self, candidate_row):
         self.money_cell = None
-        self.money_raised_text = None
-        self.money_raised = None
         super().__init__(candidate_row)
         del self.money_cell
 
@@ -475,22 +635,17 @@ class MoneyRaisedCandidateRowScraper(CandidateRowScraper):
         if self.money_cell:
             money_link_box = self.money_cell.find('a', {'href': lambda x: '/finance_summary/' in str(x)})
             if money_link_box:
-                # .get('href', None)
-                self.money_raised_text = money_link_box.text
-                self.money_raised = money_to_float(self.money_raised_text)
+                # .get('href', None); money_raised is parsed from the text for all candidates at once (see derive.py)
+                self.record.money_raised_text = money_link_box.text
 
 
 class CurrentElectionCandidateRowScraper(CandidateRowScraper):
+    record_class = CurrentElectionRow
+
     def __init__(self, candidate_row):
         self.spent_elem = None
         self.votes_elem = None
         self.voteshare_elem = None
-        self.spent_text = None
-        self.votes_text = None
-        self.voteshare_text = None
-        self.spent = None
-        self.votes = None
-        self.voteshare = None
         super().__init__(candidate_row)
         del self.spent_elem, self.votes_elem, self.voteshare_elem
 
@@ -500,6 +655,7 @@ class CurrentElectionCandidateRowScraper(CandidateRowScraper):
             self.spent_elem, self.votes_elem, self.voteshare_elem = augmented_remaining_cells
 
     def _get_remaining_cells_data(self):
+        # only the text is kept; spent, votes and voteshare are parsed for all candidates at once (see derive.py)
         self._get_spent()
         self._get_votes()
         self._get_voteshare()
@@ -507,16 +663,12 @@ class CurrentElectionCandidateRowScraper(CandidateRowScraper):
     def _get_spent(self):
         if self.spent_elem:
             spent_rellink_elem = self.spent_elem.find('a', {'href': lambda x: '/finance_summary/' in str(x)})
-            self.spent_text = get_text_from_elem(spent_rellink_elem)
-            if self.spent_text:
-                self.spent = money_to_float(self.spent_text)
+            self.record.spent_text = get_text_from_elem(spent_rellink_elem)
 
     def _get_votes(self):
         if self.votes_elem:
-            self.votes_text = get_text_from_elem(self.votes_elem, '0')
-            self.votes = safe_int(self.votes_text.replace(',', ''))
+            self.record.votes_text = get_text_from_elem(self.votes_elem, '0')
 
     def _get_voteshare(self):
         if self.voteshare_elem:
-            self.voteshare_text = get_text_from_elem(self.voteshare_elem, '0')
-            self.voteshare = pct_to_float(self.voteshare_text)
+            self.record.voteshare_text = get_text_from_elem(self.voteshare_elem, '0')
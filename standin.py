@@ -0,0 +1,168 @@
+import hashlib
+import os
+import re
+import sys
+from glob import glob
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from random import Random
+from threading import Lock, Thread
+from time import sleep
+from urllib.parse import parse_qs, urlsplit
+from cache import get_page_type
+
+
+# recorded (or synthetic) pages, as fixtures/pages/<page type>/<name>.html (see benchmark.record_fixtures)
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'pages')
+# page types served only from the fixture named like the request: a district page served for every district would
+# put its candidates in all of them (see crawler.DistrictCrawler)
+NAMED_ONLY_PAGE_TYPES = {'office'}
+
+
+class Faults:
+    # latency (seconds, plus up to latency_jitter) for every response; error_rate, throttle_rate and slow_body_rate
+    # are the fractions of requests answered with a 500, with a 429 (and Retry-After), or with a body sent in
+    # slow_body_chunks chunks slow_body_delay seconds apart
+    def __init__(self, latency=0.0, latency_jitter=0.0, error_rate=0.0, throttle_rate=0.0, retry_after=1,
+                 slow_body_rate=0.0, slow_body_chunks=10, slow_body_delay=0.2, seed=None):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.slow_body_rate = slow_body_rate
+        self.slow_body_chunks = slow_body_chunks
+        self.slow_body_delay = slow_body_delay
+        self.random = Random(seed)
+
+
+class StandinServer:
+    # local stand-in for vpap.org serving recorded pages under the same URL layout, with injected faults. Pages are
+    # picked by page type: the fixture named like the request (the slug of a search query, or a candidate number),
+    # else one chosen by hashing the URL, so that any number of candidates can be served from a few fixtures.
+    # District (office) pages are named by their office slug, e.g. house_of_delegates_10. Point the scrapers at it
+    # with the VPAP_HOMEPAGE environment variable (see scrapers.HOMEPAGE)
+    def __init__(self, port=8000, host='127.0.0.1', faults=None, fixtures_dir=FIXTURES_DIR):
+        self.faults = faults or Faults()
+        self.fixtures = {
+            page_type: sorted(glob(f'{fixtures_dir}/{page_type}/*.html'))
+            for page_type in ('search', 'candidate', 'elections', 'legislator', 'office')
+        }
+        if not any(self.fixtures.values()):
+            raise FileNotFoundError(f'No fixtures under {fixtures_dir}; every request would be a 404.')
+        self.stats = {}
+        self._lock = Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._create_handler())
+        self.httpd.daemon_threads = True
+        self.url = f'http://{host}:{self.httpd.server_address[1]}'
+        self._thread = None
+
+    def _create_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, as vpap.org
+
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def get_fixture_path(self, url):
+        split_url = urlsplit(url)
+        page_type = get_page_type(split_url.path)
+        paths = self.fixtures.get(page_type, [])
+        if not paths:
+            return None
+        if page_type == 'search':
+            # named as by benchmark.FixtureRecorder
+            name = re.sub(r'[^a-z0-9]+', '_', parse_qs(split_url.query).get('q', [''])[0].lower()).strip('_')
+        elif page_type == 'office':
+            name = split_url.path.split('/')[2].replace('-', '_')
+        else:
+            name = next((part for part in split_url.path.split('/') if part.isdigit()), '')
+        for path in paths:
+            if os.path.splitext(os.path.basename(path))[0] == name:
+                return path
+        if page_type in NAMED_ONLY_PAGE_TYPES:
+            return None
+        return paths[int(hashlib.md5(url.encode()).hexdigest(), 16) % len(paths)]
+
+    def handle(self, request):
+        faults = self.faults
+        with self._lock:
+            latency = faults.latency + faults.random.random() * faults.latency_jitter
+            roll = faults.random.random()
+            slow = faults.random.random() < faults.slow_body_rate
+        self._count('requests')
+        sleep(latency)
+
+        if roll < faults.error_rate:
+            self._count('errors')
+            return self._send(request, 500, b'Internal Server Error')
+        if roll < faults.error_rate + faults.throttle_rate:
+            self._count('throttled')
+            return self._send(request, 429, b'Too Many Requests', {'Retry-After': str(faults.retry_after)})
+
+        path = self.get_fixture_path(request.path)
+        if not path:
+            self._count('not_found')
+            return self._send(request, 404, b'Not Found')
+        body = open(path, 'rb').read()
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if request.headers.get('If-None-Match') == etag:
+            self._count('not_modified')
+            return self._send(request, 304, b'', {'ETag': etag})
+        self._count('ok')
+        if slow:
+            self._count('slow_bodies')
+        self._send(request, 200, body, {'ETag': etag, 'Content-Type': 'text/html; charset=utf-8'}, slow)
+
+    def _send(self, request, status, body, headers=None, slow=False):
+        request.send_response(status)
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        if not slow:
+            request.wfile.write(body)
+            return
+        chunk_size = len(body) // self.faults.slow_body_chunks + 1
+        for i in range(0, len(body), chunk_size):
+            request.wfile.write(body[i:i + chunk_size])
+            request.wfile.flush()
+            sleep(self.faults.slow_body_delay)
+
+    def start(self):
+        self._thread = Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    # python standin.py [port [latency [error rate [throttle rate [slow body rate]]]]]
+    args = [float(arg) for arg in sys.argv[1:]]
+    port, latency, error_rate, throttle_rate, slow_body_rate = (args + [8000, 0, 0, 0, 0][len(args):])[:5]
+    server = StandinServer(int(port), faults=Faults(
+        latency=latency, error_rate=error_rate, throttle_rate=throttle_rate, slow_body_rate=slow_body_rate,
+    ))
+    print(f'serving {sum(map(len, server.fixtures.values()))} fixtures on {server.url}; '
+          f'set VPAP_HOMEPAGE={server.url} for the scrapers')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print(server.stats)
+
+
+if __name__ == '__main__':
+    main()
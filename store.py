@@ -0,0 +1,269 @@
+import json
+import os
+import sqlite3
+from threading import Lock
+from time import time
+from pandas import read_sql_query
+from records import Bio, CandidatePage, CurrentElection, CurrentElectionRow, MoneyRaisedRow
+
+
+CANDIDATE_COLUMNS = (
+    'search_string', 'candidate_yoda_name', 'candidate_page_link', 'elections_page_link', 'legislator_page_link',
+) + CandidatePage.fields + CurrentElection.fields
+CURRENT_ELECTION_LABELS = ('candidate', 'opponent')
+PARTIES = ('D', 'R')
+CHAMBERS = ('lower', 'upper', 'other')
+DERIVED_COLUMNS = ('candidate_party', 'is_winner', 'is_incumbent', 'raised')
+# stored as 0/1 by SQLite
+BOOLEAN_COLUMNS = {'has_ie', 'winner', 'incumbency', 'is_winner', 'is_incumbent'}
+# scrapers keep numbers as text (see derive.py); these fill in a candidate's numbers from it, CAST giving 0 for text
+# that isn't a number, as scrapers.money_to_float does
+PARSE_NUMBERS_SQL = (
+    '''UPDATE race_candidates SET money_raised = CAST(REPLACE(REPLACE(money_raised_text, '$', ''), ',', '') AS REAL)
+    WHERE money_raised_text IS NOT NULL
+    AND election_link IN (SELECT election_link FROM candidacies WHERE search_string = ?)''',
+    '''UPDATE current_election_rows SET
+    spent = CASE WHEN spent_text != '' THEN CAST(REPLACE(REPLACE(spent_text, '$', ''), ',', '') AS REAL) END,
+    votes = CAST(REPLACE(votes_text, ',', '') AS INTEGER),
+    voteshare = CAST(REPLACE(REPLACE(REPLACE(voteshare_text, '%', ''), ',', ''), '-', '') AS REAL)
+    WHERE search_string = ?''',
+)
+
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS candidates (
+    {', '.join(CANDIDATE_COLUMNS)}, scraped_at REAL, PRIMARY KEY (search_string)
+);
+CREATE INDEX IF NOT EXISTS candidates_vpap_candidate_num ON candidates (vpap_candidate_num);
+CREATE TABLE IF NOT EXISTS candidate_lists (
+    year INTEGER, chamber TEXT, search_string TEXT, PRIMARY KEY (year, chamber, search_string)
+);
+CREATE TABLE IF NOT EXISTS current_election_rows (
+    search_string TEXT, label TEXT, {', '.join(CurrentElectionRow.fields)}, PRIMARY KEY (search_string, label)
+);
+CREATE TABLE IF NOT EXISTS races (
+    election_link TEXT PRIMARY KEY, year INTEGER, chamber TEXT, election_name TEXT
+);
+CREATE INDEX IF NOT EXISTS races_year_chamber ON races (year, chamber);
+CREATE TABLE IF NOT EXISTS race_candidates (
+    election_link TEXT, {', '.join(MoneyRaisedRow.fields)}, PRIMARY KEY (election_link, party)
+);
+CREATE INDEX IF NOT EXISTS race_candidates_name ON race_candidates (name);
+CREATE TABLE IF NOT EXISTS candidacies (
+    search_string TEXT, election_link TEXT, position INTEGER, PRIMARY KEY (search_string, election_link)
+);
+CREATE INDEX IF NOT EXISTS candidacies_election_link ON candidacies (election_link);
+CREATE TABLE IF NOT EXISTS ie_amounts (
+    search_string TEXT, election_link TEXT, ie_support REAL, ie_oppose REAL,
+    PRIMARY KEY (search_string, election_link)
+);
+CREATE TABLE IF NOT EXISTS bios (
+    search_string TEXT PRIMARY KEY, {', '.join(Bio.fields)}, other TEXT
+);
+
+-- the races each candidate ran in (as the D or R candidate), latest race of a year and chamber first
+CREATE VIEW IF NOT EXISTS candidacy_results AS
+SELECT
+    cy.search_string, r.year, r.chamber, r.election_name, r.election_link, ie.ie_support, ie.ie_oppose,
+    rc.party AS candidate_party, rc.winner AS is_winner, rc.incumbency AS is_incumbent, rc.money_raised AS raised,
+    ROW_NUMBER() OVER (PARTITION BY cy.search_string, r.year, r.chamber ORDER BY cy.position DESC) AS cycle_rank
+FROM candidacies cy
+JOIN candidates c ON c.search_string = cy.search_string
+JOIN races r ON r.election_link = cy.election_link
+JOIN race_candidates rc ON rc.election_link = cy.election_link AND rc.name = c.candidate_yoda_name
+    AND rc.party IN ('D', 'R')
+LEFT JOIN ie_amounts ie ON ie.search_string = cy.search_string AND ie.election_link = cy.election_link;
+'''
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def quote_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def get_unscraped_columns(full):
+    # columns of the full_export view that a scraped full would not have: a race's or current election row's columns
+    # if no candidate has that race or row, and the current election and bio fields that no candidate has a value
+    # for. A legislator's length of service is always scraped (possibly as None), like in LegislatorScraper
+    columns = [col for col in full.columns if col[0].isdigit() and full[col].isna().all()]
+    for label in CURRENT_ELECTION_LABELS:
+        if full[f'{label}_name'].isna().all():
+            columns += [f'{label}_{field}' for field in CurrentElectionRow.fields]
+    bio_columns = [col for col in full.columns if col.startswith('bio_')]
+    is_legislator = full[bio_columns].notna().any(axis=None) if bio_columns else False
+    for col in list(CurrentElection.fields) + bio_columns:
+        if col in ('bio_member_since', 'bio_years_of_service') and is_legislator:
+            continue
+        if full[col].isna().all():
+            columns.append(col)
+    return columns
+
+
+def is_boolean_column(col):
+    if col[-2:] in {'_D', '_R'}:
+        col = col[:-2]
+    return any(col == name or col.endswith(f'_{name}') for name in BOOLEAN_COLUMNS)
+
+
+class CandidateStore:
+    # normalized store of researched candidates: one row per candidate, race, race candidate (D/R), candidacy, IE
+    # amount and bio, so that new years and chambers add rows rather than columns. The wide `full` export is the
+    # `full_export` view over these tables, regenerated for the years and chambers stored (see create_full_view)
+    def __init__(self, path='data/vpap.sqlite'):
+        self.path = path
+        self._lock = Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def add(self, cr):
+        # writes a CandidateResearcher's records, replacing the candidate's previous ones
+        search_string = cr.search.result['search_string']
+        candidate = dict(cr.search.result, **cr.cand.record.as_dict())
+        current_election = cr.cand.record.get('current_election') or CurrentElection()
+        with self._lock, self.conn:
+            for table in ('current_election_rows', 'candidacies', 'ie_amounts'):
+                self.conn.execute(f'DELETE FROM {table} WHERE search_string = ?', (search_string,))
+            self._insert('candidates', dict(
+                {column: candidate.get(column) for column in CANDIDATE_COLUMNS}, scraped_at=time()
+            ))
+            for label, row in current_election.rows:
+                self._insert('current_election_rows', dict(row.as_dict(), search_string=search_string, label=label))
+            for position, election in enumerate(cr.elec.elections):
+                self._add_election(search_string, position, election)
+            self._insert('bios', dict(
+                {field: cr.legis.bio.get(field) for field in Bio.fields}, search_string=search_string,
+                other=json.dumps(cr.legis.bio.other, default=str),
+            ))
+            for sql in PARSE_NUMBERS_SQL:
+                self.conn.execute(sql, (search_string,))
+
+    def _add_election(self, search_string, position, election):
+        self._insert('races', {
+            'election_link': election.election_link, 'year': election.year, 'chamber': election.chamber,
+            'election_name': election.election_name,
+        })
+        for row in election.rows:
+            self._insert('race_candidates', dict(row.as_dict(), election_link=election.election_link))
+        self._insert('candidacies', {
+            'search_string': search_string, 'election_link': election.election_link, 'position': position,
+        })
+        if election.get('ie_support') is not None:
+            self._insert('ie_amounts', {
+                'search_string': search_string, 'election_link': election.election_link,
+                'ie_support': election.ie_support, 'ie_oppose': election.ie_oppose,
+            })
+
+    def _insert(self, table, values):
+        self.conn.execute(
+            f'INSERT OR REPLACE INTO {table} ({", ".join(values)}) VALUES ({", ".join("?" * len(values))})',
+            tuple(values.values())
+        )
+
+    def add_to_list(self, year, chamber, search_strings):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO candidate_lists VALUES (?, ?, ?)',
+                [(year, chamber, search_string) for search_string in search_strings]
+            )
+
+    def get_races(self, year=None, chamber=None):
+        # e.g. get_races(2019, 'upper') for all 2019 State Senate races, with their D and R candidates
+        return self._query(
+            f'SELECT r.year, r.chamber, r.election_name, r.election_link, '
+            f'{", ".join(f"rc.{field}" for field in MoneyRaisedRow.fields)} FROM races r '
+            'LEFT JOIN race_candidates rc ON rc.election_link = r.election_link '
+            'WHERE (? IS NULL OR r.year = ?) AND (? IS NULL OR r.chamber = ?) ORDER BY r.election_link, rc.party',
+            (year, year, chamber, chamber)
+        )
+
+    def get_cycles(self):
+        # (year, chamber) of every race a candidate ran in, latest year first
+        with self._lock:
+            cycles = self.conn.execute('SELECT DISTINCT year, chamber FROM candidacy_results').fetchall()
+        return sorted(cycles, key=lambda cycle: (
+            -cycle[0], CHAMBERS.index(cycle[1]) if cycle[1] in CHAMBERS else len(CHAMBERS), cycle[1]
+        ))
+
+    def create_full_view(self):
+        # one row per candidate with the columns of the wide full export: {year}_{chamber}_{key} for the race the
+        # candidate ran in, {year}_{chamber}_{key}_{party} for its D and R candidates, and the derived columns
+        columns = [f'c.{column}' for column in CANDIDATE_COLUMNS]
+        joins = []
+        for label in CURRENT_ELECTION_LABELS:
+            columns += [f'{label}.{field} AS {label}_{field}' for field in CurrentElectionRow.fields]
+            joins.append(
+                f"LEFT JOIN current_election_rows {label} ON {label}.search_string = c.search_string "
+                f"AND {label}.label = '{label}'"
+            )
+
+        cycles = self.get_cycles()
+        for i, (year, chamber) in enumerate(cycles):
+            prefix = f'{year}_{chamber}'
+            columns += [
+                f'cr{i}.{key} AS {quote(f"{prefix}_{key}")}'
+                for key in ('election_name', 'election_link', 'ie_support', 'ie_oppose')
+            ]
+            joins.append(
+                f'LEFT JOIN candidacy_results cr{i} ON cr{i}.search_string = c.search_string '
+                f'AND cr{i}.year = {int(year)} AND cr{i}.chamber = {quote_literal(chamber)} '
+                f'AND cr{i}.cycle_rank = 1'
+            )
+            for party in PARTIES:
+                columns += [
+                    f'{party}{i}.{field} AS {quote(f"{prefix}_{field}_{party}")}' for field in MoneyRaisedRow.fields
+                ]
+                joins.append(
+                    f"LEFT JOIN race_candidates {party}{i} ON {party}{i}.election_link = cr{i}.election_link "
+                    f"AND {party}{i}.party = '{party}'"
+                )
+
+        columns += [f'b.{field}' for field in Bio.fields]
+        joins.append('LEFT JOIN bios b ON b.search_string = c.search_string')
+        for i, (year, chamber) in enumerate(cycles):
+            columns += [f'cr{i}.{key} AS {quote(f"{year}_{chamber}_{key}")}' for key in DERIVED_COLUMNS]
+
+        with self._lock, self.conn:
+            self.conn.execute('DROP VIEW IF EXISTS full_export')
+            self.conn.execute(
+                f'CREATE VIEW full_export AS SELECT {", ".join(columns)} FROM candidates c {" ".join(joins)}'
+            )
+
+    def get_full(self, year=None, chamber=None):
+        # the full_export view, for the candidates in the year and chamber's candidate list (or every candidate),
+        # with the bio labels kept in bios.other expanded after the known ones. As in the scraped export, columns
+        # only appear if some candidate has them (see get_unscraped_columns)
+        self.create_full_view()
+        params = (year, year, chamber)
+        candidate_list_sql = (
+            '? IS NULL OR search_string IN (SELECT search_string FROM candidate_lists WHERE year = ? AND chamber = ?)'
+        )
+        full = self._query(f'SELECT * FROM full_export WHERE {candidate_list_sql}', params)
+        other = self._query(
+            f'SELECT b.search_string, j.key, j.value FROM bios b, json_each(b.other) j WHERE {candidate_list_sql} '
+            'ORDER BY b.rowid, j.id',
+            params
+        )
+        if len(other):
+            other_columns = list(dict.fromkeys(other['key']))
+            other = other.pivot(index='search_string', columns='key', values='value')[other_columns]
+            full = full.join(other, on='search_string')
+            columns = [col for col in full.columns if col not in other_columns]
+            position = columns.index(Bio.fields[-1]) + 1
+            full = full[columns[:position] + other_columns + columns[position:]]
+        full = full.drop(columns=get_unscraped_columns(full))
+        for col in full.columns:
+            if is_boolean_column(col):
+                full[col] = full[col].map({1: True, 0: False}).astype(object)
+        return full
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return read_sql_query(sql, self.conn, params=params)
+
+    def close(self):
+        self.conn.close()
@@ -1,145 +1,455 @@
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options
+import cProfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pandas import DataFrame, concat, read_csv
-from scrapers import Searcher, LegislatorScraper, CandidateScraper, ElectionsScraper
+from cache import CachingFetcher, ResponseCache, DAY
+from columnar import write_typed
+from crawler import DistrictCrawler
+from derive import derive_full, parse_numbers
+from drivers import DriverPool, GECKODRIVER_PATH
+from journal import Journal
+from metrics import metrics
+from names import CandidateIndex
+from parsing import ParsePool
+from pipeline import StagePipeline
+from planner import FetchPlanner, MAX_PARALLEL_FETCHES
+from refresh import PageRecorder, RefreshState
+from fetcher import create_fetcher, get_connection_stats, get_wrapped_fetcher
+from store import CandidateStore
+from throttle import AdaptiveFetcher
+from scrapers import Searcher, LegislatorScraper, CandidateScraper, ElectionsScraper, IEIndex
 
 
 def fillna_with_didnotrun(df):
-    for col in df.columns:
-        if col.startswith('2019') or col.startswith('2017'):
-            df[col].fillna(inplace=True, value='N/A')
+    cols = [col for col in df.columns if col.startswith('2019') or col.startswith('2017')]
+    df[cols] = df[cols].fillna('N/A')
 
 
-class CandidateResearcher:
-    def __init__(self, candidate_name, driver=None):
-        self.candidate_name = candidate_name
-        self.driver = driver
-        self.result = {}
-        self.basic = DataFrame()
-        self.full = DataFrame()
-        self._scrape_data()
-        self._create_dataframes()
+def read_candidate_list(year, chamber):
+    return set(i.strip() for i in open(f'{year}_{chamber}_candidate_list.txt').read().strip().split('\n'))
 
-    def _scrape_data(self):
-        search = Searcher(self.candidate_name)
 
-        cand = CandidateScraper(search.candidate_page_link)
-        if cand.as_federal_link:
-            cand = CandidateScraper(cand.as_state_link)
+class CandidateResearcher:
+    # research stages, in order; run=False leaves running them to the caller (see pipeline.StagePipeline). A
+    # planner.FetchPlanner runs finer steps instead, in parallel as their dependencies allow (see _run_stage)
+    STAGES = ('search', 'candidate', 'elections', 'legislator', 'ie', 'dataframes')
 
-        elec = ElectionsScraper(
-            search.elections_page_link,
-            vpap_candidate_num=cand.vpap_candidate_num, has_ie=cand.has_ie, driver=self.driver
+    def __init__(self, candidate_name, ie_index=None, fetcher=None, extraction='soup', crawler=None, run=True,
+                 parse_pool=None, name_index=None, planner=None):
+        self.candidate_name = candidate_name
+        self.ie_index = ie_index
+        self.fetcher = fetcher
+        self.extraction = extraction
+        self.crawler = crawler
+        self.parse_pool = parse_pool
+        self.name_index = name_index
+        self.result = {}
+        self.full_record = {}
+        self.search = None
+        self.cand = None
+        self.elec = None
+        self.legis = None
+        if run and planner:
+            planner.run(self)
+        elif run:
+            for stage in self.STAGES:
+                self.run_stage(stage)
+
+    def run_stage(self, stage):
+        with metrics.candidate(self.candidate_name), metrics.timer(stage):
+            self._run_stage(stage)
+
+    def _run_stage(self, stage):
+        {
+            'search': self._search,
+            'candidate': self._scrape_candidate_page,
+            'elections': self._scrape_elections_page,
+            'legislator': self._scrape_legislator_page,
+            'ie': self._resolve_ie,
+            'dataframes': self._create_dataframes,
+            # the steps of planner.CANDIDATE_PLAN that split the candidate and elections stages
+            'candidate_page': self._scrape_search_candidate_page,
+            'state_candidate_page': self._scrape_state_candidate_page,
+            'elections_page': self._fetch_elections_page,
+            'submit_ie': self._submit_ie,
+        }[stage]()
+
+    def _scrape(self, scraper_class, *args):
+        if self.parse_pool:
+            return self.parse_pool.scrape(scraper_class, *args, fetcher=self.fetcher, extraction=self.extraction)
+        return scraper_class(*args, fetcher=self.fetcher, extraction=self.extraction)
+
+    def _search(self):
+        if self.crawler:
+            self.search = self.crawler.search(self.candidate_name)
+        elif self.name_index:
+            self.search = self.name_index.search(self.candidate_name, lambda name: self._scrape(Searcher, name))
+        else:
+            self.search = self._scrape(Searcher, self.candidate_name)
+
+    def _scrape_candidate_page(self):
+        self._scrape_search_candidate_page()
+        self._scrape_state_candidate_page()
+
+    def _scrape_search_candidate_page(self):
+        self.cand = self._scrape(CandidateScraper, self.search.candidate_page_link)
+
+    def _scrape_state_candidate_page(self):
+        if self.cand.record.as_federal_link:
+            self.cand = self._scrape(CandidateScraper, self.cand.record.as_state_link)
+
+    def _scrape_elections_page(self):
+        self._fetch_elections_page()
+        self._submit_ie()
+
+    def _fetch_elections_page(self):
+        # in crawl mode, the race comes from the crawled district page instead
+        if self.crawler:
+            self.elec = self.crawler.get_race(self.search)
+        else:
+            self.elec = self._scrape(ElectionsScraper, self.search.elections_page_link)
+
+    def _submit_ie(self):
+        self.elec.submit_ie(
+            vpap_candidate_num=self.cand.record.vpap_candidate_num, has_ie=self.cand.record.has_ie,
+            ie_index=self.ie_index,
         )
-        legis = LegislatorScraper(search.legislator_page_link)
-
-        self.result = search.result.copy()
-        self.result.update(cand.__dict__)
-        self.result.update(elec.result)
-        self.result.update(legis.bio)
-
-    def _create_dataframes(self):
-        self.basic = DataFrame([self.result])
-        self.full = self.basic.copy()
-
-        for year in (2019, 2017):
-            for chamber in ('lower', 'upper', 'other'):
-                if [col for col in self.full.columns if chamber in col]:
-                    self._add_fields_to_full_dataframe(year, chamber)
-
-    def _add_fields_to_full_dataframe(self, year, chamber):
-        self._create_fields_with_default_values(year, chamber)
-
-        candidate_ran = False
-        if f'{year}_{chamber}_name_D' in self.full.columns:
-            if self.full.loc[0, 'candidate_yoda_name'] == self.full.loc[0, f'{year}_{chamber}_name_D']:
-                self._add_fields_based_on_party(year, chamber, 'D')
-                candidate_ran = True
-
-        if f'{year}_{chamber}_name_R' in self.full.columns:
-            if self.full.loc[0, 'candidate_yoda_name'] == self.full.loc[0, f'{year}_{chamber}_name_R']:
-                self._add_fields_based_on_party(year, chamber, 'R')
-                candidate_ran = True
-
-        if not candidate_ran:
-            self.full = self.full.drop(columns=[col for col in self.full.columns if f'{year}_{chamber}' in col])
 
-    def _create_fields_with_default_values(self, year, chamber):
-        self.full[f'{year}_{chamber}_candidate_party'] = [None]
-        self.full[f'{year}_{chamber}_is_winner'] = [None]
-        self.full[f'{year}_{chamber}_is_incumbent'] = [None]
-        self.full[f'{year}_{chamber}_raised'] = [None]
+    def _scrape_legislator_page(self):
+        self.legis = self._scrape(LegislatorScraper, self.search.legislator_page_link)
 
-    def _add_fields_based_on_party(self, year, chamber, party_letter):
-        party_letter = party_letter.upper()
+    def _resolve_ie(self):
+        self.elec.resolve_ie()
 
-        self.full[f'{year}_{chamber}_candidate_party'] = [party_letter]
+        self.result = self.search.result.copy()
+        self.result.update(self.cand.record.as_dict())
+        self.result.update(self.elec.result)
+        self.result.update(self.legis.bio.as_dict())
 
-        winner = self.full.loc[0, f'{year}_{chamber}_winner_{party_letter}']
-        self.full[f'{year}_{chamber}_is_winner'] = [winner]
-
-        incumbent = self.full.loc[0, f'{year}_{chamber}_incumbency_{party_letter}']
-        self.full[f'{year}_{chamber}_is_incumbent'] = [incumbent]
-
-        raised = self.full.loc[0, f'{year}_{chamber}_money_raised_{party_letter}']
-        self.full[f'{year}_{chamber}_raised'] = [raised]
+    def _create_dataframes(self):
+        # the flat record; its numbers and full columns are derived for all candidates at once (see derive.py)
+        self.full_record = self.result
 
 
 class MultiCandidateResearcher:
-    def __init__(self):
+    def __init__(self, concurrency=1, fetcher=None, driver_pool=None, extraction='soup', crawl=None, journal=None,
+                 refresh_state=None, pipeline_workers=None, store=None, scrape_ie=True, parse_workers=None,
+                 name_index=None, plan=False):
+        # concurrency=1 researches one candidate at a time (sequential mode); higher values research that many
+        # candidates at once. fetcher is one from fetcher.create_fetcher (by default, one for `concurrency` requests
+        # in flight), which sets the pacing, retries and caching of every request (see Exporter._research_and_export).
+        # crawl=(year, chamber) finds candidates and their races by crawling that chamber's district pages once
+        # (so a candidate's races are only those of that year and chamber),
+        # instead of searching for each candidate and fetching their elections page. pipeline_workers (a dict of
+        # stage: number of workers, possibly empty for the defaults) streams candidates through a StagePipeline instead.
+        # A CandidateStore, if given, gets the records of every candidate researched (not those reused unchanged).
+        # scrape_ie=False leaves out IE amounts, and with them the browsers. parse_workers (a number of processes, or
+        # 0 for one per core) parses pages in a ParsePool instead of in the fetching threads. A CandidateIndex, if
+        # given, resolves names to known candidates before searching VPAP, and learns those found by searches and
+        # crawls. plan=True runs each candidate's steps through a FetchPlanner, fetching its pages in parallel (so its
+        # fetcher should allow concurrency * MAX_PARALLEL_FETCHES requests in flight); not used with pipeline_workers.
+        # refresh_state needs a fetcher caching responses with conditional=True
+        fetch_concurrency = concurrency * MAX_PARALLEL_FETCHES if plan else concurrency
+        caching_fetcher = get_wrapped_fetcher(fetcher, CachingFetcher)
+        if refresh_state is not None and not (caching_fetcher and caching_fetcher.conditional):
+            # RefreshState.get_unchanged revalidates a candidate's pages through the CachingFetcher
+            raise ValueError('Incremental mode (refresh_state) requires a cache (create_fetcher(conditional=True)).')
+        self.concurrency = concurrency
+        self.extraction = extraction
+        self.crawl = crawl
+        self.crawler = None
+        self.journal = journal
+        self.fetcher = fetcher or create_fetcher(fetch_concurrency)
+        self.adaptive_fetcher = get_wrapped_fetcher(self.fetcher, AdaptiveFetcher)
+        self.refresh_state = refresh_state
+        self.pipeline_workers = pipeline_workers
+        self.pipeline = None
+        self.store = store
         self.result = []
+        self.full_records = []
         self.errors = []
         self.basic = DataFrame()
         self.full = DataFrame()
-        self._get_driver()
-
-    def _get_driver(self):
-        options = Options()
-        options.headless = True
-        self.driver = webdriver.Firefox(options=options, executable_path='G:/GitHub/geckodriver.exe')
+        self.ie_index = IEIndex(driver_pool or DriverPool()) if scrape_ie else None
+        self.parse_pool = ParsePool(parse_workers or None) if parse_workers is not None else None
+        self.name_index = name_index
+        self.planner = FetchPlanner(workers=fetch_concurrency) if plan else None
 
     def research(self, candidate_list):
+        with metrics.timer('run'):
+            self._research(candidate_list)
+
+    def _research(self, candidate_list):
+        if self.journal:
+            completed_candidates = self.journal.get_completed_candidates()
+            candidate_list = [candidate for candidate in candidate_list if candidate not in completed_candidates]
+        if self.crawl and not self.crawler:
+            self.crawler = DistrictCrawler(
+                *self.crawl, fetcher=self.fetcher, extraction=self.extraction, concurrency=self.concurrency
+            )
+            if self.name_index:
+                self.name_index.add_many(
+                    (candidate['name'], candidate['candidate_page_link']) for candidate in self.crawler.candidates
+                )
+        if self.pipeline_workers is not None:
+            self._research_with_pipeline(candidate_list)
+        elif self.concurrency > 1:
+            self._research_concurrently(candidate_list)
+        else:
+            for candidate in candidate_list:
+                self._add(candidate, *self._research_candidate(candidate))
+        self._create_dataframes()
+
+    def _research_concurrently(self, candidate_list):
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(self._research_candidate, candidate): candidate for candidate in candidate_list}
+            for future in as_completed(futures):
+                self._add(futures[future], *future.result())
+
+    def _research_with_pipeline(self, candidate_list):
+        remaining_candidates = []
         for candidate in candidate_list:
             try:
-                cr = CandidateResearcher(candidate, self.driver)
-
-                self.result.append(cr.result)
-                self.basic = concat((self.basic, cr.basic), sort=False)
+                cr = self._get_unchanged(candidate)
+            except Exception as exc:
+                self._add(candidate, None, exc)
+                continue
+            if cr:
+                self._add(candidate, cr, None)
+            else:
+                remaining_candidates.append(candidate)
+
+        self.pipeline = StagePipeline(self._create_researcher, CandidateResearcher.STAGES, self.pipeline_workers)
+        self.pipeline.run(remaining_candidates, self._add_researched, report_interval=60)
+        self.pipeline.print_stats()
+
+    def _research_candidate(self, candidate):
+        try:
+            cr = self._get_unchanged(candidate)
+            if cr is None:
+                cr = self._create_researcher(candidate, run=True)
+                self._record_pages(candidate, cr)
+            return cr, None
+        except Exception as exc:
+            return None, exc
+
+    def _get_unchanged(self, candidate):
+        # incremental mode: the last result, unless a page changed or it is too old (needs a CachingFetcher)
+        if self.refresh_state:
+            return self.refresh_state.get_unchanged(candidate, self.fetcher)
+        return None
+
+    def _create_researcher(self, candidate, run=False):
+        fetcher = self.planner.create_fetcher(self.fetcher) if self.planner and run else self.fetcher
+        if self.refresh_state:
+            fetcher = PageRecorder(fetcher)
+        return CandidateResearcher(
+            candidate, self.ie_index, fetcher, self.extraction, self.crawler, run=run, parse_pool=self.parse_pool,
+            name_index=self.name_index, planner=self.planner,
+        )
 
-                self.full = concat((self.full, cr.full), sort=False)
-                fillna_with_didnotrun(self.full)
+    def _record_pages(self, candidate, cr):
+        if self.refresh_state:
+            self.refresh_state.put(candidate, cr.fetcher.pages, cr.result, cr.full_record)
+
+    def _add_researched(self, candidate, cr, exc):
+        if exc is None:
+            self._record_pages(candidate, cr)
+        self._add(candidate, cr, exc)
+
+    def _add(self, candidate, cr, exc):
+        if exc is None:
+            self.result.append(cr.result)
+            self.full_records.append(cr.full_record)
+            if self.store and isinstance(cr, CandidateResearcher):
+                self.store.add(cr)
+            if self.journal:
+                self.journal.add_result(candidate, cr.result, cr.full_record)
+
+        else:
+            print(candidate, str(exc))
+            self.errors.append({
+                'candidate': candidate,
+                'error_message': str(exc),
+            })
+            if self.journal:
+                self.journal.add_error(candidate, str(exc))
+
+    def _load_journal(self):
+        entries = self.journal.load()
+        self.result = [entry['result'] for entry in entries if 'result' in entry]
+        self.full_records = [entry['full_record'] for entry in entries if 'result' in entry]
+        self.errors = [
+            {'candidate': entry['candidate'], 'error_message': entry['error_message']}
+            for entry in entries if 'error_message' in entry
+        ]
 
-            except Exception as exc:
-                print(candidate, str(exc))
-                self.errors.append({
-                    'candidate': candidate,
-                    'error_message': str(exc),
-                })
+    def _create_dataframes(self):
+        # built once from the accumulated records, rather than concatenated candidate by candidate, with their numbers
+        # and full columns derived in one vectorized pass. With a journal, the records are those of every candidate
+        # journaled so far, including in runs being resumed
+        with metrics.timer('accumulate'):
+            if self.journal:
+                self._load_journal()
+            self.basic = parse_numbers(DataFrame(self.result))
+            self.full = derive_full(parse_numbers(DataFrame(self.full_records)))
+            fillna_with_didnotrun(self.full)
+
+    def get_connection_stats(self):
+        return get_connection_stats(self.fetcher.session)
+
+    def close(self):
+        if self.ie_index:
+            self.ie_index.close()
+        if self.parse_pool:
+            self.parse_pool.close()
+        if self.planner:
+            self.planner.close()
+        self.fetcher.close()
+        if self.journal:
+            self.journal.close()
+        if self.refresh_state:
+            self.refresh_state.close()
+        if self.store:
+            self.store.close()
+        if self.name_index:
+            self.name_index.close()
 
 
 class Exporter:
     def __init__(self):
         self.year = 2017
         self.chamber = 'lower'
-        self.candidate_list = set(
-            i.strip() for i in open(f'{self.year}_{self.chamber}_candidate_list.txt').read().strip().split('\n')
-        )
+        self.concurrency = 1
+        self.pool_size = 10
+        self.delay = 2  # seconds between requests with concurrency = 1
+        self.host_interval = 0.5  # seconds between requests to the same host otherwise
+        self.retries = 3
+        self.adaptive = False  # adaptive request rate, retries with backoff and circuit breaking (see throttle.py)
+        self.driver_pool_size = 2
+        self.driver_max_pages = 50
+        self.ie_fast_mode = False
+        self.scrape_ie = True  # False leaves out IE amounts, and with them the browsers
+        self.extraction = 'soup'  # or 'xpath' (see extraction.EXTRACTION_BACKENDS)
+        # find candidates by crawling every district page of the year and chamber; their races are only those of the
+        # year and chamber (no elections page is fetched), other races being kept from the existing export
+        self.crawl = False
+        self.journal_path = f'journal/{self.year}_{self.chamber}.jsonl'
+        self.resume = False  # skip candidates already researched in the journal of an interrupted run
+        self.incremental = False  # re-scrape only candidates whose pages changed (requires cache_path)
+        self.refresh_state_path = 'cache/refresh.sqlite'
+        self.refresh_max_age = 30 * DAY  # longer than the time between refreshes (e.g. weekly)
+        self.pipeline_workers = None  # e.g. {} for the default workers per stage, see pipeline.DEFAULT_STAGE_WORKERS
+        self.store_path = None  # e.g. 'data/vpap.sqlite' to keep a normalized store and export full from it
+        self.report_path = f'reports/{self.year}_{self.chamber}'  # .json and .prom (Prometheus textfile) run reports
+        self.profile = False  # also dump cProfile stats of the run to {report_path}.prof
+        self.plan = False  # fetch each candidate's pages in parallel as their dependencies allow (see planner.py)
+        self.parse_workers = None  # parse pages in this many processes (0 for one per core), see parsing.ParsePool
+        # resolve names from candidates found before (see names.py), searching VPAP only for the others; None to
+        # always search
+        self.name_index_path = 'cache/candidate_names.sqlite'
+        self.columnar_format = None  # 'parquet' or 'feather' to also export typed files (see columnar.py)
+        self.geckodriver_path = GECKODRIVER_PATH  # from the GECKODRIVER_PATH environment variable, if set
+        self.cache_path = 'cache/responses.sqlite'  # set to None to always fetch from VPAP
+        # e.g. [(2017, 'lower'), (2019, 'lower'), (2019, 'upper')] to research the union of those candidate lists once
+        # and export each year and chamber from it; year and chamber are then only used in the journal/report paths
+        self.targets = None
+        self.candidate_list = read_candidate_list(self.year, self.chamber)
 
     def main(self):
-        mcr = MultiCandidateResearcher()
-        mcr.research(self.candidate_list)
-
-        full_all = self._merge_full_existing_with_full(mcr.full)
-        condensed_all = self._condense(full_all)
-
-        self._export_main_dataframes(mcr.full, full_all, condensed_all)
-        self._export_contingency_dataframes(mcr)
-
-        mcr.driver.quit()
-
-    def _merge_full_existing_with_full(self, full):
+        metrics.reset()
+        profiler = cProfile.Profile() if self.profile else None
+        if profiler:
+            profiler.enable()
         try:
-            full_existing = read_csv(f'data/{self.year}_{self.chamber}_full.csv')
+            self._research_and_export()
+        finally:
+            if profiler:
+                profiler.disable()
+            metrics.write_report(self.report_path, labels={'year': self.year, 'chamber': self.chamber})
+            if profiler:
+                profiler.dump_stats(f'{self.report_path}.prof')
+
+    def _research_and_export(self):
+        if self.targets:
+            candidate_lists = {(year, chamber): read_candidate_list(year, chamber) for year, chamber in self.targets}
+        else:
+            candidate_lists = {(self.year, self.chamber): self.candidate_list}
+        if self.crawl and len(candidate_lists) > 1:
+            raise ValueError('Crawl mode covers a single year and chamber; it cannot be combined with targets.')
+        if self.incremental and not self.cache_path:
+            raise ValueError('Incremental mode requires cache_path.')
+
+        fetcher = create_fetcher(
+            self.concurrency * (MAX_PARALLEL_FETCHES if self.plan else 1), adaptive=self.adaptive, retries=self.retries,
+            cache=ResponseCache(self.cache_path) if self.cache_path else None, conditional=self.incremental,
+            pool_size=self.pool_size, delay=self.delay, host_interval=self.host_interval,
+        )
+        driver_pool = DriverPool(
+            size=self.driver_pool_size, executable_path=self.geckodriver_path, max_pages=self.driver_max_pages,
+            fast=self.ie_fast_mode,
+        )
+        mcr = MultiCandidateResearcher(
+            concurrency=self.concurrency, fetcher=fetcher, driver_pool=driver_pool,
+            extraction=self.extraction, crawl=(self.year, self.chamber) if self.crawl else None,
+            journal=Journal(self.journal_path, resume=self.resume),
+            refresh_state=RefreshState(self.refresh_state_path, self.refresh_max_age) if self.incremental else None,
+            pipeline_workers=self.pipeline_workers, store=CandidateStore(self.store_path) if self.store_path else None,
+            scrape_ie=self.scrape_ie, parse_workers=self.parse_workers,
+            name_index=CandidateIndex(self.name_index_path) if self.name_index_path else None, plan=self.plan,
+        )
+        # closed even if the research or export fails, so that no browser, parse worker or session is left behind
+        try:
+            # every candidate is researched once, even if in several lists
+            mcr.research(set().union(*candidate_lists.values()))
+
+            with metrics.timer('export'):
+                for (year, chamber), candidate_list in candidate_lists.items():
+                    if self.targets:
+                        full, basic, errors = self._get_target_results(mcr, candidate_list)
+                    else:
+                        full, basic, errors = mcr.full, mcr.basic, mcr.errors
+                    self._export_target(mcr, year, chamber, full, basic, errors)
+
+            print('connections:', mcr.get_connection_stats())
+            if mcr.adaptive_fetcher:
+                print('requests:', mcr.adaptive_fetcher.get_stats())
+            if mcr.refresh_state:
+                print('unchanged candidates:', mcr.refresh_state.refreshed)
+            if mcr.planner:
+                mcr.planner.write_report(f'{self.report_path}_plan.json')
+                print('critical paths:', mcr.planner.get_summary())
+        finally:
+            mcr.close()
+
+    @staticmethod
+    def _get_target_results(mcr, candidate_list):
+        # the results of one list's candidates, without the race columns that only other lists' candidates have
+        errors = [error for error in mcr.errors if error['candidate'] in candidate_list]
+        if not len(mcr.full):
+            return mcr.full, mcr.basic, errors
+        full = mcr.full[mcr.full['search_string'].isin(candidate_list)]
+        full = full.drop(columns=[
+            col for col in full.columns
+            if (col.startswith('2019') or col.startswith('2017')) and (full[col].isna() | (full[col] == 'N/A')).all()
+        ])
+        basic = mcr.basic[mcr.basic['search_string'].isin(candidate_list)]
+        return full, basic, errors
+
+    def _export_target(self, mcr, year, chamber, full, basic, errors):
+        if mcr.store:
+            full_all = self._get_full_from_store(mcr, year, chamber, full)
+        else:
+            full_all = self._merge_full_existing_with_full(year, chamber, full)
+        condensed_all = self._condense(year, chamber, full_all)
+
+        self._export_main_dataframes(year, chamber, full, full_all, condensed_all)
+        self._export_contingency_dataframes(year, chamber, full, basic, errors)
+
+    def _merge_full_existing_with_full(self, year, chamber, full):
+        try:
+            full_existing = read_csv(f'data/{year}_{chamber}_full.csv')
+            if self.crawl:
+                full = self._add_other_races(year, chamber, full, full_existing)
             full_all = concat((full_existing, full), sort=False)
             fillna_with_didnotrun(full_all)
             full_all = full_all.drop_duplicates(subset=['search_string'], keep='last')
@@ -147,28 +457,53 @@ class Exporter:
             full_all = full
         return full_all
 
-    def _condense(self, full_all):
+    @staticmethod
+    def _add_other_races(year, chamber, full, full_existing):
+        # crawl mode only has the crawled year and chamber's races; a candidate's other races are kept from the
+        # existing export rather than lost when its row is replaced
+        other_race_columns = [
+            col for col in full_existing.columns
+            if col[:4].isdigit() and not col.startswith(f'{year}_{chamber}_')
+            and col not in full.columns
+        ]
+        if not len(full) or not other_race_columns:
+            return full
+        other_races = full_existing.drop_duplicates(subset=['search_string'], keep='last')
+        return full.join(other_races.set_index('search_string')[other_race_columns], on='search_string')
+
+    def _get_full_from_store(self, mcr, year, chamber, full):
+        # the store keeps every candidate researched in earlier runs, so there is nothing to merge
+        mcr.store.add_to_list(year, chamber, list(full['search_string']) if len(full) else [])
+        full_all = mcr.store.get_full(year, chamber)
+        fillna_with_didnotrun(full_all)
+        return full_all
+
+    def _condense(self, year, chamber, full_all):
         mapper = {}
         for desired_col, curr_col in [line.split(':', 1) for line in open('mapper.txt').read().strip().split('\n')]:
-            mapper.update({curr_col.format(year=self.year, chamber=self.chamber): desired_col})
+            mapper.update({curr_col.format(year=year, chamber=chamber): desired_col})
 
         condensed_all = full_all[list(mapper.keys())].rename(columns=mapper)
         return condensed_all
 
-    def _export_main_dataframes(self, full, full_all, condensed_all):
-        full.to_csv(f'data_test/{self.year}_{self.chamber}_full_new.csv', index=False)
-        full_all.to_csv(f'data_test/{self.year}_{self.chamber}_full.csv', index=False)
-        condensed_all.to_csv(f'data_test/{self.year}_{self.chamber}_condensed.csv', index=False)
+    def _export_main_dataframes(self, year, chamber, full, full_all, condensed_all):
+        full.to_csv(f'data_test/{year}_{chamber}_full_new.csv', index=False)
+        full_all.to_csv(f'data_test/{year}_{chamber}_full.csv', index=False)
+        condensed_all.to_csv(f'data_test/{year}_{chamber}_condensed.csv', index=False)
+
+        if self.columnar_format:
+            for df, name in ((full, 'full_new'), (full_all, 'full'), (condensed_all, 'condensed')):
+                write_typed(df, f'data_test/{year}_{chamber}_{name}', self.columnar_format)
 
-    def _export_contingency_dataframes(self, mcr):
-        full_dropped = mcr.full.drop_duplicates(subset=['search_string'], keep='last').dropna(subset=['search_string'])
-        if len(full_dropped) != len(mcr.full):
-            mcr.basic.to_csv(f'{self.year}_{self.chamber}_basic.csv', index=False)
-            full_dropped.to_csv(f'{self.year}_{self.chamber}_full_dropped.csv', index=False)
+    def _export_contingency_dataframes(self, year, chamber, full, basic, errors):
+        full_dropped = full.drop_duplicates(subset=['search_string'], keep='last').dropna(subset=['search_string'])
+        if len(full_dropped) != len(full):
+            basic.to_csv(f'{year}_{chamber}_basic.csv', index=False)
+            full_dropped.to_csv(f'{year}_{chamber}_full_dropped.csv', index=False)
 
-        if mcr.errors:
-            errors = DataFrame(mcr.errors)
-            errors.to_csv(f'data_test/{self.year}_{self.chamber}_errors.csv', index=False)
+        if errors:
+            errors = DataFrame(errors)
+            errors.to_csv(f'data_test/{year}_{chamber}_errors.csv', index=False)
 
 
 def main():
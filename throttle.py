@@ -0,0 +1,191 @@
+from email.utils import parsedate_to_datetime
+from random import uniform
+from threading import Lock
+from time import monotonic, perf_counter, sleep, time
+from requests.exceptions import ConnectionError, Timeout
+from metrics import metrics
+
+
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def get_retry_after(response):
+    # seconds to wait, from a Retry-After header in seconds or as an HTTP date
+    value = response.headers.get('Retry-After') if response is not None and hasattr(response, 'headers') else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveThrottle:
+    # spaces out requests (across all threads) by an interval, AIMD-style: every healthy, fast response adds
+    # rate_increase requests per second to the rate, and the interval is multiplied by backoff on a 429, a Retry-After,
+    # or failure_threshold failures (5xxs, connection errors or responses slower than latency_target) in a row. An
+    # isolated 5xx doesn't slow every request down, as the AdaptiveFetcher already retries it after a jittered sleep.
+    # A Retry-After also pushes back the next request of every thread
+    def __init__(self, initial_interval=2.0, min_interval=0.1, max_interval=30.0, latency_target=2.0,
+                 rate_increase=0.05, backoff=2.0, failure_threshold=3):
+        self.interval = initial_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.latency_target = latency_target
+        self.rate_increase = rate_increase
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.failures = 0
+        self.next_request_at = 0.0
+        self._lock = Lock()
+
+    def wait(self):
+        with self._lock:
+            now = monotonic()
+            request_at = max(now, self.next_request_at)
+            self.next_request_at = request_at + self.interval
+        if request_at > now:
+            sleep(request_at - now)
+        return request_at - now
+
+    def record(self, status_code, latency, retry_after=None):
+        with self._lock:
+            if status_code == 429 or retry_after:
+                self.failures = 0
+                self._back_off()
+            elif status_code is None or status_code in TRANSIENT_STATUS_CODES or latency > self.latency_target:
+                self.failures += 1
+                if self.failures >= self.failure_threshold:
+                    self.failures = 0
+                    self._back_off()
+            else:
+                self.failures = 0
+                self.interval = max(self.min_interval, 1 / (1 / self.interval + self.rate_increase))
+            if retry_after:
+                self.next_request_at = max(self.next_request_at, monotonic() + retry_after)
+
+    def _back_off(self):
+        self.interval = min(self.max_interval, self.interval * self.backoff)
+
+    @property
+    def requests_per_minute(self):
+        return 60 / self.interval
+
+
+class CircuitBreaker:
+    # opens after failure_threshold transient failures in a row, pausing every request for reset_timeout seconds;
+    # then lets a single trial request through, closing again if it succeeds
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._trial_in_flight = False
+        self._lock = Lock()
+
+    def wait(self):
+        waited = 0.0
+        while True:
+            with self._lock:
+                if self.state == 'closed':
+                    return waited
+                if self.state == 'open' and monotonic() >= self.opened_at + self.reset_timeout:
+                    self.state = 'half-open'
+                if self.state == 'half-open' and not self._trial_in_flight:
+                    self._trial_in_flight = True
+                    return waited
+                wait = max(0.1, min(1.0, self.opened_at + self.reset_timeout - monotonic()))
+            sleep(wait)
+            waited += wait
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half-open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.opens += 1
+                self.state = 'open'
+                self.opened_at = monotonic()
+            self._trial_in_flight = False
+
+
+class AdaptiveFetcher:
+    # wraps a fetcher (without its own delay) with an AdaptiveThrottle and a CircuitBreaker, and retries transient
+    # failures (429, 5xx, connection errors and timeouts) up to `retries` times with full-jitter exponential backoff
+    def __init__(self, fetcher, throttle=None, breaker=None, retries=3, backoff_factor=1.0, max_backoff=60):
+        self.fetcher = fetcher
+        self.throttle = throttle or AdaptiveThrottle()
+        self.breaker = breaker or CircuitBreaker()
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.requests = 0
+        self.retried = 0
+        self.failed = 0
+        self.started_at = monotonic()
+        self._lock = Lock()
+
+    def get(self, url, params=None, headers=None):
+        for attempt in range(self.retries + 1):
+            metrics.add('fetcher', 'breaker_seconds', self.breaker.wait())
+            metrics.add('fetcher', 'throttle_seconds', self.throttle.wait())
+
+            r, error = None, None
+            start = perf_counter()
+            try:
+                r = self.fetcher.get(url, params=params, headers=headers)
+            except (ConnectionError, Timeout) as exc:
+                error = exc
+            status_code = r.status_code if r is not None else None
+            self.throttle.record(status_code, perf_counter() - start, get_retry_after(r))
+            with self._lock:
+                self.requests += 1
+
+            if status_code is not None and status_code not in TRANSIENT_STATUS_CODES:
+                self.breaker.record_success()
+                return r
+
+            self.breaker.record_failure()
+            with self._lock:
+                self.failed += 1
+            if attempt == self.retries:
+                break
+            with self._lock:
+                self.retried += 1
+            metrics.add('fetcher', 'retries')
+            sleep(uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt)))
+
+        if r is None:
+            raise error
+        return r
+
+    def get_stats(self):
+        elapsed = monotonic() - self.started_at
+        return {
+            'requests': self.requests,
+            'retries': self.retried,
+            'transient_failures': self.failed,
+            'requests_per_minute': round(self.requests / elapsed * 60, 1) if elapsed else 0,
+            'throttle_interval': round(self.throttle.interval, 3),
+            'breaker_state': self.breaker.state,
+            'breaker_opens': self.breaker.opens,
+        }
+
+    @property
+    def session(self):
+        return self.fetcher.session
+
+    def close(self):
+        self.fetcher.close()
@@ -0,0 +1,317 @@
+import hashlib
+import json
+import os
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from time import monotonic, sleep, time
+from extraction import make_soup
+from fetcher import create_fetcher
+from metrics import metrics
+from names import CandidateIndex
+from scrapers import (
+    CandidateCurrentElectionScraper, Searcher, find_current_election_elem, get_text_from_elem, pct_to_float, safe_int,
+)
+from task import read_candidate_list
+from throttle import AdaptiveThrottle, get_retry_after
+
+
+# fields of a current election row whose changes are emitted
+WATCHED_FIELDS = ('votes', 'voteshare', 'winner')
+
+
+def get_row_values(row):
+    # the watched fields of a CurrentElectionRow, parsed from their text
+    return {
+        'votes': safe_int((row.get('votes_text') or '').replace(',', '')) if row.get('votes_text') else None,
+        'voteshare': pct_to_float(row.get('voteshare_text')) if row.get('voteshare_text') else None,
+        'winner': row.get('winner'),
+    }
+
+
+def get_timestamp(http_date):
+    try:
+        return parsedate_to_datetime(http_date).timestamp() if http_date else None
+    except (TypeError, ValueError):
+        return None
+
+
+class JsonLinesSink:
+    # where deltas go, one JSON object per line: a file (appended to), or tcp://host:port (e.g. that of `nc -lk 9000`)
+    def __init__(self, target):
+        self.socket = None
+        if target.startswith('tcp://'):
+            host, port = target[len('tcp://'):].rsplit(':', 1)
+            self.socket = socket.create_connection((host, int(port)))
+            self.file = self.socket.makefile('w', encoding='utf-8')
+        else:
+            if os.path.dirname(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+            self.file = open(target, 'a', encoding='utf-8')
+        self._lock = Lock()
+
+    def write(self, event):
+        with self._lock:
+            self.file.write(json.dumps(event, default=str) + '\n')
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+        if self.socket:
+            self.socket.close()
+
+
+class WatchedRace:
+    # a race, polled through the candidate page of one of its candidates (the page's "current election" panel)
+    def __init__(self, candidate_page_link, interval):
+        self.candidate_page_link = candidate_page_link
+        self.election_rellink = None
+        self.election_office = None
+        self.active = True
+        self.etag = None
+        self.last_modified = None
+        self.page_hash = None
+        self.panel_hash = None
+        self.rows = {}  # candidate name: watched field values
+        self.interval = interval
+        self.next_poll_at = 0.0
+        self.polled_at = None
+        self.polls = 0
+        self.not_modified = 0
+        self.changes = 0
+        self.errors = 0
+        self.staleness = []
+
+    def get_report(self):
+        return {
+            'candidate_page_link': self.candidate_page_link,
+            'election_rellink': self.election_rellink,
+            'election_office': self.election_office,
+            'active': self.active,
+            'polls': self.polls,
+            'not_modified': self.not_modified,
+            'changes': self.changes,
+            'errors': self.errors,
+            'interval_seconds': round(self.interval, 1),
+            'last_staleness_seconds': self.staleness[-1] if self.staleness else None,
+            'max_staleness_seconds': max(self.staleness) if self.staleness else None,
+            'mean_staleness_seconds': round(sum(self.staleness) / len(self.staleness), 3) if self.staleness else None,
+        }
+
+
+def create_watch_fetcher(concurrency=8):
+    return create_fetcher(concurrency, adaptive=True, throttle=AdaptiveThrottle(initial_interval=0.5))
+
+
+class RaceWatcher:
+    # election-night watch mode: polls races' candidate pages with conditional requests (ETag / Last-Modified), and
+    # writes a delta to the sink for every candidate whose votes, vote share or winner changed. A page is only parsed
+    # if its body changed, and its current election table only if the panel's HTML changed. Every race has its own
+    # interval: halved when the race changed, grown by half when it didn't, within [min_interval, max_interval].
+    # Staleness is the time from the change (per Last-Modified, or at worst the previous poll) to its delta
+    def __init__(self, candidate_page_links, sink, fetcher=None, concurrency=8, interval=30, min_interval=5,
+                 max_interval=300, extraction='soup'):
+        self.sink = sink
+        self.fetcher = fetcher or create_watch_fetcher(concurrency)
+        self.concurrency = concurrency
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.extraction = extraction
+        self.races = [WatchedRace(link, interval) for link in dict.fromkeys(candidate_page_links)]
+        self.races_by_rellink = {}
+        self._in_flight = set()
+        self._lock = Lock()
+
+    def run(self, duration=None, report_path=None, report_interval=60):
+        # polls until duration seconds have passed (or forever), writing {report_path}_races.json and the metrics
+        # report every report_interval seconds
+        started_at = monotonic()
+        next_report_at = started_at + report_interval
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            try:
+                while duration is None or monotonic() - started_at < duration:
+                    self._submit_due(executor)
+                    if report_path and monotonic() >= next_report_at:
+                        self.write_report(report_path)
+                        next_report_at += report_interval
+                    next_poll_at = min((race.next_poll_at for race in self.races if race.active), default=None)
+                    sleep(min(1.0, max(0.05, (next_poll_at or 0) - monotonic())))
+            except KeyboardInterrupt:
+                pass
+        if report_path:
+            self.write_report(report_path)
+
+    def _submit_due(self, executor):
+        now = monotonic()
+        for race in self.races:
+            with self._lock:
+                if not race.active or race in self._in_flight or race.next_poll_at > now:
+                    continue
+                self._in_flight.add(race)
+            executor.submit(self._poll, race)
+
+    def _poll(self, race):
+        try:
+            changed = self.poll(race)
+            race.interval = (
+                max(self.min_interval, race.interval / 2) if changed
+                else min(self.max_interval, race.interval * 1.5)
+            )
+            race.next_poll_at = monotonic() + race.interval
+        except Exception as exc:
+            race.errors += 1
+            metrics.add('watch', 'errors')
+            print(race.candidate_page_link, str(exc))
+            race.interval = min(self.max_interval, race.interval * 2)
+            race.next_poll_at = monotonic() + race.interval
+        finally:
+            with self._lock:
+                self._in_flight.discard(race)
+
+    def poll(self, race):
+        # returns whether any watched field of the race changed
+        headers = {}
+        if race.etag:
+            headers['If-None-Match'] = race.etag
+        if race.last_modified:
+            headers['If-Modified-Since'] = race.last_modified
+        previous_polled_at = race.polled_at
+        race.polled_at = time()
+        with metrics.timer('watch', 'fetch_seconds'):
+            r = self.fetcher.get(race.candidate_page_link, headers=headers)
+        race.polls += 1
+        metrics.add('watch', 'polls')
+
+        if r.status_code == 304:
+            race.not_modified += 1
+            metrics.add('watch', 'not_modified')
+            return False
+        if not r.ok:
+            retry_after = get_retry_after(r)
+            if retry_after:
+                race.interval = max(race.interval, retry_after)
+            raise AssertionError(f'Status {r.status_code} for {race.candidate_page_link}')
+
+        race.etag = r.headers.get('ETag')
+        race.last_modified = r.headers.get('Last-Modified')
+        page_hash = hashlib.md5(r.content).hexdigest()
+        if page_hash == race.page_hash:
+            return False
+        race.page_hash = page_hash
+        with metrics.timer('watch', 'parse_seconds'):
+            return self._parse(race, r.text, previous_polled_at)
+
+    def _parse(self, race, text, previous_polled_at):
+        soup = make_soup(text, 'candidate', self.extraction)
+        current_election_elem = find_current_election_elem(soup)
+        if not current_election_elem:
+            return False
+        panel_hash = hashlib.md5(str(current_election_elem).encode()).hexdigest()
+        if panel_hash == race.panel_hash:
+            return False
+        race.panel_hash = panel_hash
+
+        candidate_name = get_text_from_elem(soup.find('h3', {'style': 'margin-top:0;'}), '')
+        current_election = CandidateCurrentElectionScraper(current_election_elem, candidate_name).record
+        if not self._claim_race(race, current_election):
+            return False
+
+        # the change happened after the previous poll, or at the page's Last-Modified time if the server sends one
+        changed_at = get_timestamp(race.last_modified) or previous_polled_at
+        changed = False
+        for _, row in current_election.rows:
+            values = get_row_values(row)
+            previous_values = race.rows.get(row.name)
+            race.rows[row.name] = values
+            changed_fields = [
+                field for field in WATCHED_FIELDS if previous_values is None or previous_values[field] != values[field]
+            ]
+            if not changed_fields:
+                continue
+            emitted_at = time()
+            event = dict(
+                values, race=race.election_rellink, election_office=race.election_office, candidate=row.name,
+                party=row.get('party'), changed=changed_fields, initial=previous_values is None, emitted_at=emitted_at,
+            )
+            if previous_values is not None:
+                changed = True
+                event['previous'] = {field: previous_values[field] for field in changed_fields}
+                if changed_at:
+                    event['staleness_seconds'] = round(emitted_at - changed_at, 3)
+                    race.staleness.append(event['staleness_seconds'])
+                    metrics.add('watch', 'staleness_seconds', event['staleness_seconds'])
+            self.sink.write(event)
+            metrics.add('watch', 'deltas')
+        if changed:
+            race.changes += 1
+            metrics.add('watch', 'changes')
+        return changed
+
+    def _claim_race(self, race, current_election):
+        # a race is polled through a single candidate page: the first one found showing it
+        race.election_rellink = current_election.get('election_rellink') or race.candidate_page_link
+        race.election_office = current_election.get('election_office')
+        with self._lock:
+            claimed_by = self.races_by_rellink.setdefault(race.election_rellink, race)
+        if claimed_by is not race:
+            race.active = False
+            return False
+        return True
+
+    def get_report(self):
+        return {'races': [race.get_report() for race in self.races]}
+
+    def write_report(self, path_prefix):
+        metrics.write_report(path_prefix, labels={'mode': 'watch'})
+        with open(f'{path_prefix}_races.json.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.get_report(), f, indent=2)
+        os.replace(f'{path_prefix}_races.json.tmp', f'{path_prefix}_races.json')
+
+    def close(self):
+        self.fetcher.close()
+        self.sink.close()
+
+
+def get_candidate_page_links(candidate_list, fetcher=None, name_index=None):
+    # the candidate page of each listed candidate, from the CandidateIndex if it has them, else searched
+    links = []
+    for candidate in sorted(candidate_list):
+        try:
+            if name_index:
+                search = name_index.search(candidate, lambda name: Searcher(name, fetcher=fetcher))
+            else:
+                search = Searcher(candidate, fetcher=fetcher)
+        except AssertionError as exc:
+            print(candidate, str(exc))
+            continue
+        links.append(search.candidate_page_link)
+    return links
+
+
+def main():
+    # python watch.py year chamber [sink [duration in seconds]]: watches the races of the year and chamber's
+    # candidate list, writing deltas to the sink (by default journal/watch_{year}_{chamber}.jsonl)
+    year, chamber = sys.argv[1:3]
+    sink = sys.argv[3] if len(sys.argv) > 3 else f'journal/watch_{year}_{chamber}.jsonl'
+    duration = float(sys.argv[4]) if len(sys.argv) > 4 else None
+    name_index = CandidateIndex()
+    fetcher = create_watch_fetcher()
+    try:
+        links = get_candidate_page_links(read_candidate_list(year, chamber), fetcher, name_index)
+    except BaseException:
+        fetcher.close()
+        raise
+    finally:
+        name_index.close()
+    watcher = RaceWatcher(links, JsonLinesSink(sink), fetcher=fetcher)
+    try:
+        print(f'watching {len(links)} candidate pages; deltas to {sink}')
+        watcher.run(duration, report_path=f'reports/watch_{year}_{chamber}')
+    finally:
+        watcher.close()
+
+
+if __name__ == '__main__':
+    main()